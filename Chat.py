@@ -1,17 +1,28 @@
 import streamlit as st
 import os
 import psycopg2
-import shutil
-from bs4 import BeautifulSoup
+import text_extraction
 import google.generativeai as genai
-import ollama
 from dotenv import load_dotenv
-import re
 import json
-import socket
-import urllib.error
-import urllib.request
 import time
+import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import concurrency
+import db_pool
+import connectivity
+import response_cache
+import chunking
+import packing
+import question_catalog
+import metrics
+import model_health
+import ollama_session
+import rate_limiter
+import providers
+import document_pipeline
+import folder_watcher
+import run_manifest
 
 # Load environment variables
 load_dotenv()
@@ -64,6 +75,7 @@ if "app_config" not in st.session_state:
         "gemini_api_key": "",
         "ollama_model": "deepseek-r1:1.5b",
         "temperature": 0.5,
+        "stream_responses": True,
         "gemini_model_sequence": load_gemini_sequence() # Load sequence on app start
     }
     st.session_state["app_config"]["selected_model"] = st.session_state["app_config"]["gemini_model_sequence"][0] if st.session_state["app_config"]["gemini_model_sequence"] else None
@@ -73,14 +85,21 @@ if "model_sequence_inputs" not in st.session_state:
     st.session_state["model_sequence_inputs"] = st.session_state["app_config"].get("gemini_model_sequence", []) + [None]
 if "gemini_models_last_fetch" not in st.session_state:
     st.session_state["gemini_models_last_fetch"] = 0
-# Function to check internet connection
-def check_internet_connection():
-    """Checks for internet connection by trying to reach Google."""
+@st.cache_resource
+def get_connectivity_monitor():
+    """Process-wide background prober for Google, Gemini, Ollama and Supabase."""
+    monitor = connectivity.get_monitor()
     try:
-        with urllib.request.urlopen('https://www.google.com', timeout=5) as response:
-            return True
-    except urllib.error.URLError:
-        return False
+        supabase = st.secrets["supabase"]
+        monitor.set_endpoint("database", f"tcp://{supabase['host']}:{supabase['port']}")
+    except Exception:
+        monitor.set_endpoint("database", connectivity.DEFAULT_ENDPOINTS["internet"])
+    return monitor
+
+# Function to check internet connection
+def check_internet_connection(endpoint="internet"):
+    """Answers from the cached state of the background connectivity monitor."""
+    return get_connectivity_monitor().is_online(endpoint)
 
 def load_configuration():
     conn = get_connection()
@@ -122,7 +141,7 @@ def save_configuration():
         cursor.close()
         conn.close()
 def login(email, password):
-    if not check_internet_connection():
+    if not check_internet_connection("database"):
         st.error("❌ No internet connection. Cannot log in.")
         return
 
@@ -195,9 +214,10 @@ def login(email, password):
             
 # --- Modified register() Function (using your existing get_connection()) ---
 def register(email, password):
-    if not check_internet_connection():
+    if not check_internet_connection("database"):
         st.error("❌ No internet connection. Cannot register.")
         return
+    conn = None
     try:
         # Generate API Key
         api_key = os.urandom(24).hex()
@@ -221,14 +241,79 @@ def register(email, password):
                 st.session_state["show_login"] = True
                 st.rerun()
             cursor.close()
-            conn.close()
         else:
             st.error("❌ Could not connect to the database.")
     except Exception as e:
         st.error(f"❌ Registration failed: {e}")
+    finally:
+        # Return the connection to the pool even when st.rerun() interrupts
+        if conn:
+            conn.close()
+
 
+ADMIN_PAGE_SIZE = int(os.getenv("LAWBOT_ADMIN_PAGE_SIZE", "25"))
+
+def fetch_users_page(columns, email_prefix="", after_email=None, page_size=ADMIN_PAGE_SIZE, conn=None):
+    """
+    One page of user_api_keys rows ordered by email, starting after after_email
+    (keyset pagination, so later pages cost the same as the first).
+    Uses conn when given (and leaves it open), else its own pooled connection.
+    Returns (rows, has_more).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    if not conn:
+        st.error("❌ Could not connect to the database.")
+        return [], False
+    cursor = conn.cursor()
+    try:
+        # Escape LIKE wildcards so the search is a plain prefix match
+        pattern = email_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        cursor.execute(
+            f"""
+            SELECT {", ".join(columns)} FROM user_api_keys
+            WHERE email LIKE %s AND (%s::text IS NULL OR email > %s)
+            ORDER BY email
+            LIMIT %s
+            """,
+            (pattern, after_email, after_email, page_size + 1)
+        )
+        rows = cursor.fetchall()
+        return rows[:page_size], len(rows) > page_size
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+def paginated_users(view_key, columns, conn=None):
+    """
+    Renders an email prefix search and Previous/Next buttons, and returns the
+    rows of the visible page only. The start of every page visited is kept in
+    session state, so going back does not need an OFFSET either. Callers are
+    st.fragment functions, so paging reruns only that section.
+    """
+    prefix = st.text_input("🔍 Search by email prefix", key=f"{view_key}_search").strip()
+    if st.session_state.get(f"{view_key}_prefix") != prefix:
+        st.session_state[f"{view_key}_prefix"] = prefix
+        st.session_state[f"{view_key}_cursors"] = [None]
+    cursors = st.session_state.setdefault(f"{view_key}_cursors", [None])
+
+    rows, has_more = fetch_users_page(columns, prefix, cursors[-1], conn=conn)
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("⬅️ Previous", key=f"{view_key}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col_page:
+        st.caption(f"Page {len(cursors)} · {len(rows)} users shown")
+    with col_next:
+        st.button(
+            "Next ➡️", key=f"{view_key}_next", disabled=not has_more,
+            on_click=cursors.append, args=(rows[-1][0] if rows else None,)
+        )
+    return rows
 
 # --- Modified manage_user_api_keys() Function (using your existing get_connection()) ---
+@st.fragment
 def manage_user_api_keys():
     st.subheader("🔑 Manage User API Keys")
     conn = get_connection()
@@ -236,57 +321,55 @@ def manage_user_api_keys():
         st.error("❌ Could not connect to the database.")
         return
 
-    cursor = conn.cursor()
-    cursor.execute("SELECT email, api_key FROM user_api_keys")
-    api_key_data = cursor.fetchall()
+    try:
+        api_key_data = paginated_users("api_keys", ["email", "api_key"], conn=conn)
 
-    if not api_key_data:
-        st.info("No user API keys found.")
-    else:
-        st.info("List of User API Keys:")
-        for email, current_api_key in api_key_data:
-            col1, col2 = st.columns([3, 5])
-            with col1:
-                st.markdown(f"**Email:** {email}")
-            with col2:
-                new_api_key = st.text_input("API Key", current_api_key, type="password", key=f"api_key_input_{email}")
-                if new_api_key != current_api_key:
-                    if st.button("Update API Key", key=f"update_api_key_{email}"):
-                        try:
-                            update_cursor = conn.cursor()
-                            update_cursor.execute("UPDATE user_api_keys SET api_key = %s WHERE email = %s", (new_api_key, email))
-                            conn.commit()
-                            st.success(f"✅ API Key updated for {email}")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"❌ Error updating API Key for {email}: {e}")
-                        finally:
-                            update_cursor.close()
-
-    st.markdown("---")
-    st.subheader("➕ Add New User API Key")
-    new_email = st.text_input("Email for new API Key:")
-    new_api = st.text_input("New API Key:", type="password")
-    if st.button("➕ Add API Key"):
-        if new_email and new_api:
-            try:
-                insert_cursor = conn.cursor()
-                insert_cursor.execute("INSERT INTO user_api_keys (email, api_key) VALUES (%s, %s)", (new_email, new_api))
-                conn.commit()
-                st.success(f"✅ API Key added for {new_email}")
-                st.rerun()
-            except psycopg2.errors.UniqueViolation:
-                st.error(f"❌ Email '{new_email}' already exists in the API Key table.")
-                conn.rollback()
-            except Exception as e:
-                st.error(f"❌ Error adding API Key: {e}")
-            finally:
-                insert_cursor.close()
+        if not api_key_data:
+            st.info("No user API keys found.")
         else:
-            st.warning("Please enter both email and API Key.")
+            st.info("List of User API Keys:")
+            for email, current_api_key in api_key_data:
+                col1, col2 = st.columns([3, 5])
+                with col1:
+                    st.markdown(f"**Email:** {email}")
+                with col2:
+                    new_api_key = st.text_input("API Key", current_api_key, type="password", key=f"api_key_input_{email}")
+                    if new_api_key != current_api_key:
+                        if st.button("Update API Key", key=f"update_api_key_{email}"):
+                            try:
+                                update_cursor = conn.cursor()
+                                update_cursor.execute("UPDATE user_api_keys SET api_key = %s WHERE email = %s", (new_api_key, email))
+                                conn.commit()
+                                st.success(f"✅ API Key updated for {email}")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"❌ Error updating API Key for {email}: {e}")
+                            finally:
+                                update_cursor.close()
 
-    cursor.close()
-    conn.close()
+        st.markdown("---")
+        st.subheader("➕ Add New User API Key")
+        new_email = st.text_input("Email for new API Key:")
+        new_api = st.text_input("New API Key:", type="password")
+        if st.button("➕ Add API Key"):
+            if new_email and new_api:
+                try:
+                    insert_cursor = conn.cursor()
+                    insert_cursor.execute("INSERT INTO user_api_keys (email, api_key) VALUES (%s, %s)", (new_email, new_api))
+                    conn.commit()
+                    st.success(f"✅ API Key added for {new_email}")
+                    st.rerun()
+                except psycopg2.errors.UniqueViolation:
+                    st.error(f"❌ Email '{new_email}' already exists in the API Key table.")
+                    conn.rollback()
+                except Exception as e:
+                    st.error(f"❌ Error adding API Key: {e}")
+                finally:
+                    insert_cursor.close()
+            else:
+                st.warning("Please enter both email and API Key.")
+    finally:
+        conn.close()
 
 def logout():
     st.session_state["user"] = None
@@ -358,21 +441,15 @@ def demote_from_admin(email):
         conn.close()
 
 # --- Manage Users from Supabase (was Firebase) ---
+@st.fragment
 def manage_users():
     st.subheader("🧑‍💻 Manage Users")
     if st.session_state["user_role"] != "admin":
         st.error("❌ Only admins can manage users.")
         return
 
-    conn = get_connection()
-    if not conn:
-        st.error("❌ Could not connect to the database.")
-        return
-
-    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT email, role FROM user_api_keys")
-        users_data = cursor.fetchall()
+        users_data = paginated_users("users", ["email", "role"])
 
         for email, role in users_data:
             col1, col2, col3 = st.columns([3, 2, 2])
@@ -391,9 +468,6 @@ def manage_users():
                         st.rerun()
     except Exception as e:
         st.error(f"❌ Error fetching users: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 def auth_section():
     st.title("🔒 Authentication")
     
@@ -423,361 +497,155 @@ def auth_section():
         st.info("📧 Contact admin for password reset")
 
 
-def get_connection():
-    try:
-        conn = psycopg2.connect(
-        host=st.secrets["supabase"]["host"],
-        port=st.secrets["supabase"]["port"],
-        dbname=st.secrets["supabase"]["database"],
-        user=st.secrets["supabase"]["user"],
-        password=st.secrets["supabase"]["password"],
-        sslmode="require"
-    )
-
-        return conn
-    except Exception as e:
-        st.error(f"❌ Could not connect to Supabase: {e}")
-        return None
-
-
-def extract_text_from_html(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    text = soup.get_text(separator='\n')
-    # Remove any potential script or style content that might still be present
-    for script in soup(["script", "style"]):
-        script.decompose()
-    text = soup.get_text()
-    # Further cleaning: remove extra whitespace and newlines
-    text = ' '.join(text.split())
-    return text
-
-
-def generate_prompt(extracted_text, selected_questions):
-    prompt = f"""
-    ## AI Assistant for Legal Document Analysis
-    Extracted Text:
-    {extracted_text}
-    """
-    if selected_questions:
-        prompt += "\n### Selected Tasks:\n"
-        for idx, question in enumerate(selected_questions, 1):
-            prompt += f"✅ Task {idx}: {question}\n"
-    else:
-        prompt += "\n❌ No tasks selected."
-
-    prompt += "\n\n*Instructions:*\n"
-    prompt += "- Answer each task based on the extracted text.\n"
-    prompt += "- If a task cannot be answered, state 'Information not available.'\n"
-    return prompt
-
-def get_gemini_response(prompt): # Removed selected_model argument
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot get Gemini response.")
-        return "❌ No internet connection."
+@st.cache_resource
+def get_connection_pool():
+    """Process-wide Supabase connection pool shared by every Streamlit session."""
+    supabase = st.secrets["supabase"]
 
-    temperature = st.session_state["app_config"].get("temperature")
-    model_sequence = st.session_state["app_config"].get("gemini_model_sequence", [])
-
-    for model in model_sequence:
-        st.info(f"⏳ Attempting to get response from **{model}**...") # Inform the user
-        try:
-            model_instance = genai.GenerativeModel(model)
-            response = model_instance.generate_content(
-                prompt,
-                generation_config={"temperature": temperature}
-            )
-            st.success(f"✅ Response received from **{model}**!") # Indicate success
-            return f"[Response from: {model}]\n\n{response.text}" # Add model name to response
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "quota" in error_msg or "rate limit" in error_msg:
-                st.warning(f"⚠ Quota exceeded for {model}, trying next model...")
-                continue # Try the next model in the sequence
-            else:
-                st.error(f"❌ Error with model {model}: {e}")
-                return f"❌ Error with model {model}: {e}"
-
-    # If all Gemini models failed, switch to DeepSeek
-    st.warning("⚠ All configured Gemini models have failed. Switching to DeepSeek...")
-    deepseek_response = get_deepseek_response(prompt, st.session_state["app_config"]["ollama_model"])
-    return f"[Response from: DeepSeek - {st.session_state['app_config']['ollama_model']}]\n\n{deepseek_response}"
-
-def get_deepseek_response(prompt, selected_model):
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot get DeepSeek response.")
-        return "❌ No internet connection."
-    temperature = st.session_state["app_config"].get("temperature") # Get temperature
-    try:
-        response = ollama.chat(
-            model=selected_model,
-            messages=[{"role": "user", "content": prompt}],
-            options={"temperature": temperature}
+    def connect():
+        return psycopg2.connect(
+            host=supabase["host"],
+            port=supabase["port"],
+            dbname=supabase["database"],
+            user=supabase["user"],
+            password=supabase["password"],
+            sslmode="require"
         )
-        response_content = response['message']['content']
-        if '<think>' in response_content:
-            response_content = response_content.split('</think>')[-1].strip()
-        return f"[Response from: DeepSeek - {selected_model}]\n\n{response_content}" # Add model name
-    except Exception as e:
-        return f"❌ Error generating response: {str(e)}"
 
-def read_txt_file(file_path):
-    """
-    Reads a text file and returns its content.
-    """
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
-    except UnicodeDecodeError:
-        # Try another encoding if UTF-8 fails
-        with open(file_path, "r", encoding="latin-1") as f:
-            return f.read()
-        
-def process_html(file_path, file_name, selected_questions):
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot process file.")
-        return None
-
-    config = st.session_state["app_config"]
-    output_folder = config["output_folder"]
-    input_folder = config["input_folder"]
-    completed_folder = config["completed_folder"]
-
-    st.info(f"ℹ️ Processing file: {file_path}")
-
-    output_subfolder = output_folder
-    if not os.path.exists(output_subfolder):
-        os.makedirs(output_subfolder, exist_ok=True)
-
-
-
-    # Determine file type and process accordingly
-    file_extension = os.path.splitext(file_name)[1].lower()
-    
-    if file_extension in ['.html', '.htm']:
-        with open(file_path, "r", encoding="utf-8") as f:
-            file_content = f.read()
-        extracted_text = extract_text_from_html(file_content)
-    elif file_extension in ['.txt']:
-        extracted_text = read_txt_file(file_path)
-    else:
-        st.error(f"❌ Unsupported file type: {file_extension}")
-        return None
+    return db_pool.ConnectionPool(
+        connect,
+        max_size=supabase.get("pool_max_size", 10),
+        min_size=supabase.get("pool_min_size", 0),
+        idle_timeout=supabase.get("pool_idle_timeout", 300),
+        health_check_after=supabase.get("pool_health_check_after", 30),
+        acquire_timeout=supabase.get("pool_acquire_timeout", 10),
+    )
 
-    formatted_prompt = generate_prompt(extracted_text, selected_questions)
 
-    response = None
+def get_connection():
+    """Checks a connection out of the shared pool; conn.close() returns it."""
     try:
-        if config["model_provider"] == "Google Gemini":
-            if not st.session_state.get("gemini_api_configured", False):
-                api_key = st.session_state["user"].get("api_key")
-                if api_key:
-                    genai.configure(api_key=api_key)
-                    st.session_state["gemini_api_configured"] = True
-                    st.info("🔑 Configured Gemini API key")
-                else:
-                    st.error("❌ No API key available. Please contact admin.")
-                    return None
-            response = get_gemini_response(formatted_prompt)
-        else:
-            response = get_deepseek_response(formatted_prompt, config["ollama_model"])
+        return get_connection_pool().getconn()
     except Exception as e:
-        st.error(f"❌ Error generating response: {e}")
-        return None
-
-    if response:
-        # Save .txt file
-        base_name = os.path.splitext(file_name)[0]
-        name_part = base_name.split('_')[0]  # remove suffix part
-        if name_part.startswith("YB"):
-            extracted_name = name_part[2:]
-        elif name_part.startswith("HN"):
-            extracted_name = name_part[2:]
-        else:
-            extracted_name = name_part
-
-        txt_file_name = f"{extracted_name}.txt"
-        txt_file_path = os.path.join(output_subfolder, txt_file_name)
-        with open(txt_file_path, "w", encoding="utf-8") as txt_file:
-            txt_file.write(response)
-
-        # Move processed file to completed folder
-        if not os.path.exists(completed_folder):
-            os.makedirs(completed_folder, exist_ok=True)
-
-        try:
-            destination_path = os.path.join(completed_folder, file_name)
-            shutil.move(file_path, destination_path)
-            st.success(f"✅ Moved processed file to: {destination_path}")
-        except Exception as e:
-            st.error(f"❌ Error moving processed file: {e}")
-
-        return response
-    else:
-        return None
-
-
-# New function to process HTML files within their folder structure
-def process_html_in_folder(file_path, file_name, selected_questions, destination_subfolder):
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot process HTML.")
-        return None
-
-    config = st.session_state["app_config"]
-    output_folder = config["output_folder"]
-
-    st.info(f"ℹ️ Processing file: {file_path}")
-
-    subfolder_name = os.path.basename(os.path.dirname(file_path))
-    output_subfolder = os.path.join(output_folder, subfolder_name)
-
-    if not os.path.exists(output_subfolder):
-        os.makedirs(output_subfolder, exist_ok=True)
-
-    # Determine file type and process accordingly
-    file_extension = os.path.splitext(file_name)[1].lower()
-    
-    if file_extension in ['.html', '.htm']:
-        with open(file_path, "r", encoding="utf-8") as f:
-            file_content = f.read()
-        extracted_text = extract_text_from_html(file_content)
-    elif file_extension in ['.txt']:
-        extracted_text = read_txt_file(file_path)
-    else:
-        st.error(f"❌ Unsupported file type: {file_extension}")
-        return None
-
-    formatted_prompt = generate_prompt(extracted_text, selected_questions)
-
-    response = None
-    try:
-        if config["model_provider"] == "Google Gemini":
-            if not st.session_state.get("gemini_api_configured", False):
-                api_key = st.session_state["user"].get("api_key")
-                if api_key:
-                    genai.configure(api_key=api_key)
-                    st.session_state["gemini_api_configured"] = True
-                    st.info("🔑 Configured Gemini API key")
-                else:
-                    st.error("❌ No API key available. Please contact admin.")
-                    return None
-            response = get_gemini_response(formatted_prompt)
-        else:
-            response = get_deepseek_response(formatted_prompt, config["ollama_model"])
-    except Exception as e:
-        st.error(f"❌ Error generating response: {e}")
+        st.error(f"❌ Could not connect to Supabase: {e}")
         return None
 
-    if response:
-        base_name = os.path.splitext(file_name)[0]  # e.g., HN40169_31 or YBm67453_1002
-
-        # Remove suffix part (everything after the first underscore)
-        if "_" in base_name:
-            name_part = base_name.split('_')[0]  # Get part before first underscore
-        else:
-            name_part = base_name
-
-        # Now remove prefix if it exists
-        if name_part.startswith("YB"):
-            extracted_name = name_part[2:]  # Remove "YB"
-        elif name_part.startswith("HN"):
-            extracted_name = name_part[2:]  # Remove "HN"
-        else:
-            extracted_name = name_part
-
-        txt_file_name = f"{extracted_name}.txt"
-        txt_file_path = os.path.join(output_subfolder, txt_file_name)
-        with open(txt_file_path, "w", encoding="utf-8") as txt_file:
-            txt_file.write(response)
 
-        # Move processed HTML file to completed subfolder instead of root completed folder
-        try:
-            destination_path = os.path.join(destination_subfolder, file_name)
-            shutil.copy2(file_path, destination_path)  # Copy the file to destination first
-            st.success(f"✅ Copied processed file to: {destination_path}")
-        except Exception as e:
-            st.error(f"❌ Error copying processed file: {e}")
+def processing_settings():
+    """The session's app config plus the user's Gemini API key, as passed to document_pipeline."""
+    return dict(st.session_state["app_config"], api_key=(st.session_state.get("user") or {}).get("api_key"))
+
+@st.cache_resource
+def get_rate_limiter():
+    """Process-wide token buckets per (API key, model); optionally kept in Postgres."""
+    if os.getenv("LAWBOT_RATE_LIMIT_BACKEND", "memory") == "postgres":
+        rate_limiter.set_limiter(rate_limiter.PostgresRateLimiter(lambda: get_connection_pool().getconn()))
+    return rate_limiter.get_limiter()
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide on-disk LLM response cache."""
+    return response_cache.get_cache()
+
+@st.cache_resource
+def get_run_manifest():
+    """Process-wide record of finished folder files, so an interrupted run resumes where it stopped."""
+    return run_manifest.get_manifest()
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Starts the /metrics endpoint (LAWBOT_METRICS_PORT) and file writer (LAWBOT_METRICS_FILE) once per server."""
+    return {"port": metrics.start_exporters(), "file": metrics.METRICS_FILE, "error": metrics.endpoint_error}
+
+@st.cache_resource
+def warm_ollama_model(model):
+    """Loads the Ollama model in the background once per server and model, so the first document does not wait for it."""
+    session = ollama_session.get_session()
+    if ollama_session.PRELOAD:
+        session.preload_in_background(model)
+    return session
+
+def script_ctx_initializer():
+    """Thread-pool initializer that lets worker threads use this session's st.* context."""
+    script_ctx = get_script_run_ctx()
+
+    def attach_script_ctx():
+        add_script_run_ctx(threading.current_thread(), script_ctx)
+
+    return attach_script_ctx
+
+def process_upload(data, file_name, selected_questions, stream=False):
+    get_connectivity_monitor()
+    get_rate_limiter()
+    return document_pipeline.process_upload(
+        data, file_name, selected_questions, processing_settings(), st,
+        stream=stream, initializer=script_ctx_initializer()
+    )
 
-        return response
-    else:
-        return None
-    
 def process_folder(folder_path, selected_questions):
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot process folder.")
-        return
-
-    completed_folder = st.session_state["app_config"]["completed_folder"]
-    if not os.path.exists(completed_folder):
-        os.makedirs(completed_folder, exist_ok=True)
-
-    subfolders_to_process = [
-        os.path.join(folder_path, d) for d in os.listdir(folder_path)
-        if os.path.isdir(os.path.join(folder_path, d))
-    ]
-
-    if not subfolders_to_process:
-        st.warning("⚠ No subfolders found in the source folder.")
-        return
-
-    total_subfolders = len(subfolders_to_process)
+    get_connectivity_monitor()
+    get_rate_limiter()
     progress_bar = st.progress(0)
 
-    moved_subfolders_count = 0
-    for i, subfolder_path in enumerate(subfolders_to_process):
-        subfolder_name = os.path.basename(subfolder_path)
-        st.info(f"📂 Processing subfolder {i+1}/{total_subfolders}: {subfolder_name}")
-
-        supported_files = []
-        files_processed_successfully = True
-
-        for root, _, files in os.walk(subfolder_path):
-            for file in files:
-                if file.lower().endswith((".htm", ".html", ".txt")):
-                    supported_files.append(os.path.join(root, file))
-
-        if not supported_files:
-            st.warning(f"⚠ No supported files (.html/.htm/.txt) found in subfolder: {subfolder_name}")
-        else:
-            destination_subfolder_path = os.path.join(completed_folder, subfolder_name)
-            if not os.path.exists(destination_subfolder_path):
-                os.makedirs(destination_subfolder_path, exist_ok=True)
+    def show_result(job, finished, total):
+        if job.result:
+            subfolder_name = os.path.basename(job.subfolder)
+            file_name = os.path.basename(job.file_path)
+            st.text_area(f"Response for {file_name} in {subfolder_name} ({job.seconds:.1f}s)", job.result, height=150, key=f"response_{subfolder_name}_{file_name}")
+        progress_bar.progress(finished / total)
 
-            for file_path in supported_files:
-                file_name = os.path.basename(file_path)
-                st.info(f"📄 Processing file in {subfolder_name}: {file_name}")
-                try:
-                    response = process_html_in_folder(file_path, file_name, selected_questions, destination_subfolder_path)
-                    if not response:
-                        files_processed_successfully = False
-                        st.warning(f"⚠️ Processing failed for {file_name} in {subfolder_name}. Folder will not be moved.")
-                        break
-                    else:
-                        st.text_area(f"Response for {file_name} in {subfolder_name}", response, height=150, key=f"response_{subfolder_name}_{file_name}")
-                except Exception as e:
-                    files_processed_successfully = False
-                    st.error(f"❌ Error processing {file_name} in {subfolder_name}: {e}. Folder will not be moved.")
-                    break
-
-            if not files_processed_successfully:
-                st.error(f"🛑 Errors in '{subfolder_name}'. Skipping folder move.")
-                continue
-
-        try:
-            if os.path.exists(subfolder_path) and files_processed_successfully:
-                shutil.rmtree(subfolder_path)
-                moved_subfolders_count += 1
-                st.success(f"✅ Processed subfolder '{subfolder_name}' and moved contents to: {destination_subfolder_path}")
-        except Exception as e:
-            st.error(f"❌ Error removing source subfolder '{subfolder_name}' after processing: {e}")
+    summary = document_pipeline.run_folder(
+        folder_path, selected_questions, processing_settings(), st,
+        on_result=show_result, initializer=script_ctx_initializer(), manifest=get_run_manifest()
+    )
+    if summary is None or not summary["subfolders"]:
+        return
+    progress_bar.progress(1.0)
+    if summary["resumed"]:
+        st.info(f"⏭️ Reused {summary['resumed']} answers from an earlier interrupted run.")
+    st.success(f"✅ Successfully attempted to process {summary['subfolders']} subfolders. Moved {len(summary['moved'])} subfolders.")
+
+
+def watch_folder(folder_path, selected_questions):
+    """Starts or stops the server-side watcher that answers new files in folder_path as they arrive."""
+    if folder_watcher.get_watcher(folder_path) is None:
+        if st.button("👀 Watch Folder"):
+            if not selected_questions:
+                st.warning("⚠️ Select at least one question before watching the folder.")
+            else:
+                get_connectivity_monitor()
+                get_rate_limiter()
+                folder_watcher.start_watcher(processing_settings(), selected_questions, manifest=get_run_manifest())
+                st.rerun()
+        return
+    if st.button("⏹️ Stop Watching"):
+        folder_watcher.stop_watcher(folder_path)
+        st.rerun()
+    watch_folder_status(folder_path)
 
-        progress_bar.progress((i + 1) / total_subfolders)
 
-    st.success(f"✅ Successfully attempted to process {total_subfolders} subfolders. Moved {moved_subfolders_count} subfolders.")
+@st.fragment(run_every=5)
+def watch_folder_status(folder_path):
+    watcher = folder_watcher.get_watcher(folder_path)
+    if watcher is None:
+        return
+    stats = watcher.stats
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Waiting to settle", watcher.pending())
+    col2.metric("Batches", stats["batches"])
+    col3.metric("Answered", stats["succeeded"])
+    col4.metric("Failed", stats["failed"])
+    st.caption(
+        f"Watching since {stats['started_at']} with {len(watcher.selected_questions)} questions · "
+        f"last batch {stats['last_batch'] or 'none yet'} · files are picked up {watcher.debounce:g}s after they stop changing"
+    )
+    for logged_at, level, message in reversed(watcher.reporter.recent(15)):
+        st.text(f"{logged_at}  {message}")
 
 
 def get_available_gemini_models():
     """Dynamically fetch available Gemini models from the Google Generative AI API."""
-    if not check_internet_connection():
+    if not check_internet_connection("gemini"):
         st.error("❌ No internet connection. Cannot fetch Gemini models.")
         return []
     
@@ -792,11 +660,8 @@ def get_available_gemini_models():
                 # Return a default list as fallback
                 return ["gemini-2.5-pro-exp-03-25", "gemini-2.0-pro", "gemini-1.5-pro", "gemini-2.0-flash"]
         
-        # Configure the API with the available key
-        genai.configure(api_key=api_key)
-        
-        # Get list of available models
-        models = genai.list_models()
+        # Get list of available models with the available key
+        models = genai.list_models(client=providers.gemini_client(api_key, "model"))
         # Filter for only Gemini models
         gemini_models = [model.name.split('/')[-1] for model in models if 'gemini' in model.name.lower()]
         
@@ -906,6 +771,50 @@ def admin_ui():
                 st.warning("⚠️ Please select at least one Gemini model in the sequence.")
                 st.session_state["app_config"]["selected_model"] = None
 
+            st.subheader("🩺 Model Health")
+            health_snapshot = model_health.registry.snapshot()
+            for model in st.session_state["app_config"]["gemini_model_sequence"]:
+                model_state = health_snapshot.get(model)
+                col1, col2, col3 = st.columns([3, 4, 1])
+                with col1:
+                    if not model_state or model_state["state"] == "closed":
+                        st.markdown(f"🟢 **{model}** · healthy")
+                    elif model_state["state"] == "half_open":
+                        st.markdown(f"🟡 **{model}** · trial request pending")
+                    else:
+                        st.markdown(f"🔴 **{model}** · cooling down, {model_state['cooldown_remaining']:.0f}s left")
+                with col2:
+                    if model_state:
+                        st.caption(
+                            f"Successes: {model_state['successes']} · Quota errors: {model_state['quota_errors']}"
+                            + (f" · Last: {model_state['last_error'][:120]}" if model_state["last_error"] else "")
+                        )
+                with col3:
+                    if model_state and st.button("Reset", key=f"reset_health_{model}"):
+                        model_health.registry.reset(model)
+                        st.rerun()
+
+            st.subheader("🚦 Rate Limits")
+            st.info("📝 Requests and tokens per minute allowed per API key. Calls wait for capacity instead of failing.")
+            limiter = get_rate_limiter()
+            for model in st.session_state["app_config"]["gemini_model_sequence"]:
+                limits = limiter.limits_for(model)
+                col1, col2, col3 = st.columns([3, 2, 2])
+                with col1:
+                    st.markdown(f"**{model}**")
+                with col2:
+                    rpm = st.number_input("RPM", min_value=1, value=limits["rpm"], key=f"rpm_{model}")
+                with col3:
+                    tpm = st.number_input("TPM", min_value=1000, step=1000, value=limits["tpm"], key=f"tpm_{model}")
+                if (rpm, tpm) != (limits["rpm"], limits["tpm"]):
+                    limiter.set_limits(model, rpm, tpm)
+            limiter_stats = limiter.stats()
+            if limiter_stats:
+                st.dataframe(
+                    [dict(bucket=name, **values) for name, values in sorted(limiter_stats.items())],
+                    use_container_width=True
+                )
+
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown(f"**Active Gemini Model:** {st.session_state['app_config'].get('selected_model', 'Not Selected')}")
@@ -929,6 +838,161 @@ def admin_ui():
                 index=default_index
             )
 
+        st.subheader("📄 HTML Extraction")
+        parser_options = ["auto"] + text_extraction.available_parsers()
+        current_parser = text_extraction.HTML_PARSER if text_extraction.HTML_PARSER in parser_options else "auto"
+        text_extraction.HTML_PARSER = st.selectbox(
+            "HTML parser backend",
+            parser_options,
+            index=parser_options.index(current_parser),
+            help=f"auto uses {text_extraction.resolve_parser('auto')} on this server"
+        )
+
+        st.subheader("✂️ Long Documents")
+        chunking_modes = ["auto", "always", "off"]
+        chunking.CHUNKING_MODE = st.selectbox(
+            "Chunked map-reduce mode",
+            chunking_modes,
+            index=chunking_modes.index(chunking.CHUNKING_MODE) if chunking.CHUNKING_MODE in chunking_modes else 0,
+            help="auto splits documents larger than the model's chunk budget into parts"
+        )
+        chunking.DEFAULT_CHUNK_TOKENS = st.number_input(
+            "Chunk budget for Gemini models (tokens)",
+            min_value=1000, max_value=1000000, step=1000,
+            value=chunking.DEFAULT_CHUNK_TOKENS
+        )
+
+        st.subheader("📦 Small Documents")
+        packing.PACKING_ENABLED = st.checkbox(
+            "Pack small files of a subfolder into one request",
+            value=packing.PACKING_ENABLED,
+            help="Saves requests-per-minute quota; falls back to one request per file if the reply cannot be split"
+        )
+        packing.PACK_MAX_DOCS = st.number_input(
+            "Files per packed request",
+            min_value=2, max_value=50,
+            value=packing.PACK_MAX_DOCS
+        )
+
+        st.subheader("⚡ Parallel Processing")
+        st.info("📝 Limits apply to every session and folder run on this server.")
+        max_workers = st.number_input(
+            "Parallel files per folder run",
+            min_value=1, max_value=64,
+            value=concurrency.get_max_workers()
+        )
+        concurrency.set_max_workers(max_workers)
+        provider_limit = st.number_input(
+            f"Max in-flight requests for {model_provider}",
+            min_value=1, max_value=64,
+            value=concurrency.get_limit("provider", model_provider) or concurrency.get_max_workers()
+        )
+        concurrency.set_limit("provider", model_provider, provider_limit)
+        if model_provider == "Google Gemini":
+            limited_models = st.session_state["app_config"]["gemini_model_sequence"]
+        else:
+            limited_models = [st.session_state["app_config"]["ollama_model"]]
+        for model in limited_models:
+            model_limit = st.number_input(
+                f"Max in-flight requests for {model} (0 = provider limit only)",
+                min_value=0, max_value=64,
+                value=concurrency.get_limit("model", model) or 0,
+                key=f"model_limit_{model}"
+            )
+            concurrency.set_limit("model", model, model_limit)
+
+        st.subheader("🌐 Connectivity")
+        monitor = get_connectivity_monitor()
+        probe_interval = st.number_input(
+            "Probe interval (seconds)",
+            min_value=5, max_value=600,
+            value=int(monitor.interval)
+        )
+        if probe_interval != int(monitor.interval):
+            monitor.set_interval(probe_interval)
+        for name, state in sorted(monitor.status().items()):
+            status_icon = "🟢" if state["online"] else "🔴"
+            checked = time.strftime("%H:%M:%S", time.localtime(state["checked_at"]))
+            detail = f"{state['latency_ms']} ms" if state["online"] else state["error"]
+            st.markdown(f"{status_icon} **{name}** ({state['url']}) · {detail} · checked {checked}")
+        if st.button("🔄 Re-check Now"):
+            monitor.refresh()
+
+        st.subheader("♻️ Response Cache")
+        cache = get_response_cache()
+        cache.enabled = st.toggle("Reuse cached responses for identical requests", value=cache.enabled)
+        cache_stats = cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hits", cache_stats["hits"])
+        col2.metric("Misses", cache_stats["misses"])
+        col3.metric("Entries", cache_stats["entries"])
+        col4.metric("Size", f"{cache_stats['bytes'] / (1024 * 1024):.1f} MB")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Reused answers", cache_stats["answer_hits"])
+        col2.metric("New answers", cache_stats["answer_misses"])
+        col3.metric("Stored answers", cache_stats["answers"])
+        col4.metric("Answer size", f"{cache_stats['answer_bytes'] / (1024 * 1024):.1f} MB")
+        if st.button("🧹 Clear Response Cache"):
+            cache.clear()
+            st.success("✅ Response cache cleared.")
+
+        st.subheader("🗄️ Database Connection Pool")
+        try:
+            pool_stats = get_connection_pool().stats()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("In use", pool_stats["in_use"])
+            col2.metric("Idle", pool_stats["idle"])
+            col3.metric("Max size", pool_stats["max_size"])
+            col4.metric("Reused / created", f"{pool_stats['reused']} / {pool_stats['created']}")
+            st.caption(
+                f"Waits: {pool_stats['waits']} · Timeouts: {pool_stats['timeouts']} · "
+                f"Evicted idle: {pool_stats['evicted']} · Failed health checks: {pool_stats['health_check_failures']} · "
+                f"Discarded: {pool_stats['discarded']}"
+            )
+        except Exception as e:
+            st.error(f"❌ Could not read connection pool stats: {e}")
+
+        st.subheader("🧠 Ollama Sessions")
+        session = warm_ollama_model(st.session_state["app_config"]["ollama_model"])
+        col1, col2 = st.columns(2)
+        session.keep_alive = col1.text_input(
+            "Keep models loaded for",
+            value=str(session.keep_alive),
+            help="Ollama keep_alive, e.g. 30m, 2h, or -1 to keep models loaded until the server stops"
+        )
+        session.max_context = col2.number_input(
+            "Largest context window (tokens)",
+            min_value=2048, max_value=131072, step=2048,
+            value=session.max_context
+        )
+        st.caption(f"Ollama host: {session.host} · the context window grows with the longest prompt, up to the value above")
+        session_stats = session.stats()
+        if session_stats:
+            st.dataframe(session_stats, use_container_width=True, hide_index=True)
+        if st.button("🔥 Preload Ollama Model Now"):
+            seconds = session.preload(st.session_state["app_config"]["ollama_model"])
+            if seconds is None:
+                st.error(f"❌ Could not load the model from {session.host}.")
+            else:
+                st.success(f"✅ Model loaded and kept resident ({seconds:.1f}s).")
+
+        st.subheader("📈 Pipeline Stage Timings")
+        exporter = start_metrics_exporters()
+        if exporter["port"]:
+            st.caption(f"Prometheus endpoint: http://<server>:{exporter['port']}/metrics")
+        if exporter["error"]:
+            st.warning(f"⚠️ {exporter['error']}")
+        if exporter["file"]:
+            st.caption(f"Prometheus text file: {exporter['file']}")
+        stage_summary = metrics.registry.summary()
+        if stage_summary:
+            st.dataframe(stage_summary, use_container_width=True, hide_index=True)
+        else:
+            st.info("No documents processed since the server started.")
+        if st.button("🧹 Reset Timings"):
+            metrics.registry.reset()
+            st.rerun()
+
         if st.button("💾 Save Configuration"):
             save_configuration()
 
@@ -939,151 +1003,128 @@ def admin_ui():
         manage_questions("Deep_seek")
 def manage_questions(table_name):
     st.subheader(f"Manage {table_name} Questions")
+    st.caption(f"🗂️ Question catalog version {question_catalog.catalog.version(table_name)} (shared by every session, refreshed after each edit)")
     conn = get_connection()
     if not conn:
         st.error("❌ Could not connect to the database.")
         return
 
     cursor = conn.cursor()
+    try:
+        # Fetch existing questions
+        cursor.execute(f"SELECT id, q_id, ques FROM {table_name} ORDER BY id")
+        questions_data = cursor.fetchall()
+        st.session_state[f"{table_name}_questions"] = {row[0]: row[2] for row in questions_data}
 
-    # Fetch existing questions
-    cursor.execute(f"SELECT id, q_id, ques FROM {table_name} ORDER BY id")
-    questions_data = cursor.fetchall()
-    st.session_state[f"{table_name}_questions"] = {row[0]: row[2] for row in questions_data}
-
-    if not st.session_state.get(f"{table_name}_questions"):
-        st.info(f"No questions available in the {table_name} table.")
-    else:
-        st.info(f"List of {table_name} Questions:")
-        for question_id, question_text in st.session_state[f"{table_name}_questions"].items():
-            col1, col2 = st.columns([1, 5])
-            with col1:
-                st.markdown(f"**ID:** {question_id}")
-            with col2:
-                updated_question = st.text_area("Question", question_text, key=f"question_edit_{table_name}_{question_id}")
-                col_btn1, col_btn2 = st.columns(2)
-                with col_btn1:
-                    if st.button("💾 Update", key=f"update_btn_{table_name}_{question_id}"):
-                        try:
-                            update_cursor = conn.cursor()
-                            update_cursor.execute(f"UPDATE {table_name} SET ques = %s WHERE id = %s", (updated_question, question_id))
-                            conn.commit()
-                            st.success(f"✅ Question ID {question_id} updated!")
-                            renumber_questions(conn, table_name)  # Renumber after update
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"❌ Error updating question ID {question_id}: {e}")
-                        finally:
-                            if 'update_cursor' in locals():
-                                update_cursor.close()
-                with col_btn2:
-                    if st.button("🗑️ Delete", key=f"delete_btn_{table_name}_{question_id}"):
-                        try:
-                            delete_cursor = conn.cursor()
-                            delete_cursor.execute(f"DELETE FROM {table_name} WHERE id = %s", (question_id,))
-                            conn.commit()
-                            st.success(f"✅ Question ID {question_id} deleted!")
-                            renumber_questions(conn, table_name)  # Renumber after delete
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"❌ Error deleting question ID {question_id}: {e}")
-                        finally:
-                            if 'delete_cursor' in locals():
-                                delete_cursor.close()
-            st.markdown("---")
-
-    st.subheader(f"➕ Add New Question to {table_name}")
-    new_question = st.text_area("Enter new question to add:", key=f"new_question_{table_name}")
-    if st.button(f"➕ Add Question to {table_name}"):
-        if new_question:
-            try:
-                # 1. Get the next available ID to generate q_id
-                add_cursor = conn.cursor()
-                add_cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table_name}")
-                next_id = add_cursor.fetchone()[0]
-                next_q_id = f"Q_{next_id}"
+        if not st.session_state.get(f"{table_name}_questions"):
+            st.info(f"No questions available in the {table_name} table.")
+        else:
+            st.info(f"List of {table_name} Questions:")
+            for question_id, question_text in st.session_state[f"{table_name}_questions"].items():
+                col1, col2 = st.columns([1, 5])
+                with col1:
+                    st.markdown(f"**ID:** {question_id}")
+                with col2:
+                    updated_question = st.text_area("Question", question_text, key=f"question_edit_{table_name}_{question_id}")
+                    col_btn1, col_btn2 = st.columns(2)
+                    with col_btn1:
+                        if st.button("💾 Update", key=f"update_btn_{table_name}_{question_id}"):
+                            try:
+                                update_cursor = conn.cursor()
+                                update_cursor.execute(f"UPDATE {table_name} SET ques = %s WHERE id = %s", (updated_question, question_id))
+                                conn.commit()
+                                question_catalog.catalog.invalidate(table_name)
+                                st.success(f"✅ Question ID {question_id} updated!")
+                                renumber_questions(conn, table_name)  # Renumber after update
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"❌ Error updating question ID {question_id}: {e}")
+                            finally:
+                                if 'update_cursor' in locals():
+                                    update_cursor.close()
+                    with col_btn2:
+                        if st.button("🗑️ Delete", key=f"delete_btn_{table_name}_{question_id}"):
+                            try:
+                                delete_cursor = conn.cursor()
+                                delete_cursor.execute(f"DELETE FROM {table_name} WHERE id = %s", (question_id,))
+                                conn.commit()
+                                question_catalog.catalog.invalidate(table_name)
+                                st.success(f"✅ Question ID {question_id} deleted!")
+                                renumber_questions(conn, table_name)  # Renumber after delete
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"❌ Error deleting question ID {question_id}: {e}")
+                            finally:
+                                if 'delete_cursor' in locals():
+                                    delete_cursor.close()
+                st.markdown("---")
+
+        st.subheader(f"➕ Add New Question to {table_name}")
+        new_question = st.text_area("Enter new question to add:", key=f"new_question_{table_name}")
+        if st.button(f"➕ Add Question to {table_name}"):
+            if new_question:
+                try:
+                    # 1. Get the next available ID to generate q_id
+                    add_cursor = conn.cursor()
+                    add_cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table_name}")
+                    next_id = add_cursor.fetchone()[0]
+                    next_q_id = f"Q_{next_id}"
                 
-                # 2. Insert the new question with both q_id and ques
-                add_cursor.execute(f"INSERT INTO {table_name} (q_id, ques) VALUES (%s, %s)", (next_q_id, new_question))
-                conn.commit()
-                st.success(f"✅ Question '{new_question[:20]}...' added (renumbering...)!")
-                add_cursor.close()
+                    # 2. Insert the new question with both q_id and ques
+                    add_cursor.execute(f"INSERT INTO {table_name} (q_id, ques) VALUES (%s, %s)", (next_q_id, new_question))
+                    conn.commit()
+                    question_catalog.catalog.invalidate(table_name)
+                    st.success(f"✅ Question '{new_question[:20]}...' added (renumbering...)!")
+                    add_cursor.close()
 
-                # 3. Immediately renumber the questions
-                renumber_questions(conn, table_name)
-                st.rerun()
+                    # 3. Immediately renumber the questions
+                    renumber_questions(conn, table_name)
+                    st.rerun()
 
-            except Exception as e:
-                if conn:
-                    conn.rollback()
-                st.error(f"❌ Error adding question: {e}")
-            finally:
-                if conn:
-                    cursor.close()
-                    conn.close()
+                except Exception as e:
+                    if conn:
+                        conn.rollback()
+                    st.error(f"❌ Error adding question: {e}")
+    finally:
+        cursor.close()
+        conn.close()
 def renumber_questions(conn, table_name):
-    
-    cursor = conn.cursor()
+    """Set-based renumbering in one transaction; readers never see a half-renumbered table."""
     try:
-        # Fetch all questions ordered by the original id
-        cursor.execute(f"SELECT ques FROM {table_name} ORDER BY id")
-        questions = cursor.fetchall()
-
-        # Clear the table
-        cursor.execute(f"DELETE FROM {table_name}")
-        conn.commit()
-
-        # Insert questions with new sequential ids and q_ids
-        for i, (ques,) in enumerate(questions):
-            new_id = i + 1
-            new_q_id = f"Q_{new_id}"
-            cursor.execute(f"INSERT INTO {table_name} (id, q_id, ques) VALUES (%s, %s, %s)", (new_id, new_q_id, ques))
-        conn.commit()
-        st.info(f"🔄 Questions in '{table_name}' table renumbered and resorted.")
+        if question_catalog.renumber_questions(conn, table_name):
+            st.info(f"🔄 Questions in '{table_name}' table renumbered and resorted.")
     except Exception as e:
-        conn.rollback()
         st.error(f"❌ Error renumbering questions in '{table_name}': {e}")
     finally:
-        cursor.close()
+        question_catalog.catalog.invalidate(table_name)
 
 
-def get_gemini_questions():
-    if not check_internet_connection():
+def load_questions(table_name):
+    """Reads (q_id, ques) rows from the database; None if they could not be read."""
+    if not check_internet_connection("database"):
         st.error("❌ No internet connection. Cannot fetch questions.")
-        return []
+        return None
     conn = get_connection()
     if conn:
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT q_id, ques FROM Gemini ORDER BY id") # Order by id to maintain sequence
+            cursor.execute(f"SELECT q_id, ques FROM {table_name} ORDER BY id") # Order by id to maintain sequence
             rows = cursor.fetchall()
             return [(row[0], row[1]) for row in rows] if rows else [] # Returns a list of tuples (q_id, ques)
         except Exception as e:
-            st.error(f"⚠ Error fetching questions from Gemini table: {e}")
-            return []
+            st.error(f"⚠ Error fetching questions from {table_name} table: {e}")
+            return None
         finally:
             cursor.close()
             conn.close()
-    return []
+    return None
+
+def get_gemini_questions():
+    """Served from the process-wide question catalog; reloaded only after an admin edit."""
+    return question_catalog.catalog.get("Gemini", lambda: load_questions("Gemini"))
 
 def get_deepseek_questions():
-    if not check_internet_connection():
-        st.error("❌ No internet connection. Cannot fetch questions.")
-        return []
-    conn = get_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT q_id, ques FROM Deep_seek ORDER BY id") # Order by id to maintain sequence
-            rows = cursor.fetchall()
-            return [(row[0], row[1]) for row in rows] if rows else [] # Returns a list of tuples (q_id, ques)
-        except Exception as e:
-            st.error(f"⚠ Error fetching questions from Deep_seek table: {e}")
-            return []
-        finally:
-            cursor.close()
-            conn.close()
-    return []
+    return question_catalog.catalog.get("Deep_seek", lambda: load_questions("Deep_seek"))
 
 def user_ui():
     st.title("⚖ Document Analyzer")
@@ -1181,6 +1222,10 @@ def user_ui():
         uploaded_file = None
         if processing_mode == "Upload Single File":
             uploaded_file = st.file_uploader("📥 Upload an HTML or TXT file", type=["htm", "html", "txt"])  # Added "txt" type
+            st.session_state["app_config"]["stream_responses"] = st.toggle(
+                "Show the answer as it is generated",
+                value=st.session_state["app_config"].get("stream_responses", True)
+            )
         else:  # Process Folder
             input_folder = st.session_state["app_config"]["input_folder"]
             st.info(f"🔍 Using configured input folder: {input_folder}")
@@ -1232,18 +1277,8 @@ def user_ui():
                 else:
                     try:
                         file_name = uploaded_file.name
-                        file_content = uploaded_file.getvalue().decode("utf-8")
-
-                        # Create temp file in input folder
-                        input_folder = st.session_state["app_config"]["input_folder"]
-                        if not os.path.exists(input_folder):
-                            os.makedirs(input_folder, exist_ok=True)
-
-                        temp_path = os.path.join(input_folder, file_name)
-                        with open(temp_path, "w", encoding="utf-8") as f:
-                            f.write(file_content)
-
-                        response = process_html(temp_path, file_name, selected_questions)  # Changed to process_html
+                        # Answered from memory; the pipeline archives the upload to the completed folder
+                        response = process_upload(uploaded_file.getvalue(), file_name, selected_questions, stream=st.session_state["app_config"].get("stream_responses", True))
                         if response:
                             st.success("✅ Analysis Complete!")
                             st.download_button(
@@ -1261,8 +1296,11 @@ def user_ui():
         elif processing_mode == "Process Folder":
             if st.button("🚀 Process Folder"):  # Add a button for folder processing
                 process_folder(input_folder, selected_questions)
+            watch_folder(input_folder, selected_questions)
 
 def main():
+    start_metrics_exporters()
+    warm_ollama_model(st.session_state["app_config"]["ollama_model"])
 
     if not st.session_state["logged_in"]:
         auth_section()
@@ -7,6 +7,8 @@ from firebase_admin import credentials, firestore
 import requests
 import json
 import re
+import kyno_retrieval
+import streaming
 
 # -------------- Configuration --------------
 st.set_page_config(page_title="KynoHealth Chatbot", page_icon="💬", layout="wide")
@@ -43,17 +45,29 @@ MODEL_CONFIG = {
 
 # -------------- Helper Functions --------------
 
-@st.cache_data(show_spinner=False)
-def load_scraped_data():
+# Retrieval settings: only the top-k passages, capped at a token budget, are sent per question
+RETRIEVAL_TOP_K = kyno_retrieval.DEFAULT_TOP_K
+RETRIEVAL_MAX_TOKENS = kyno_retrieval.DEFAULT_CONTEXT_TOKENS
+
+@st.cache_resource(show_spinner=False)
+def load_kyno_index():
+    # The index reloads itself from disk, or rebuilds, when kyno_scraped_data.txt changes
+    index = kyno_retrieval.KynoIndex("kyno_scraped_data.txt")
     try:
-        with open("kyno_scraped_data.txt", "r", encoding="utf-8") as f:
-            return f.read()
+        index.refresh()
     except Exception as e:
         st.error(f"Failed to load scraped data: {e}")
+    return index
+
+def retrieve_context(question):
+    try:
+        return load_kyno_index().build_context(question, RETRIEVAL_TOP_K, RETRIEVAL_MAX_TOKENS)
+    except Exception as e:
+        st.error(f"Failed to search scraped data: {e}")
         return ""
 
-def ask_question(question, context, user_role):
-    prompt = f"""
+def build_prompt(question, context):
+    return f"""
 Context from KynoHealth website:
 {context}
 
@@ -65,13 +79,16 @@ Also provide Email, Phone number, and Address of KynoHealth if relevant.
 If no info, say "Contact KynoHealth (email, phone, address) to know more".
 """
 
+def stream_question(question, context, user_role):
+    """Asks Gemini and yields the answer text as it is produced."""
+    prompt = build_prompt(question, context)
     try:
         model_name = MODEL_CONFIG[user_role]["name"]
         gemini_model = genai.GenerativeModel(model_name)
-        response = gemini_model.generate_content(prompt)
-        return response.text
+        response = gemini_model.generate_content(prompt, stream=True)
+        yield from streaming.gemini_text_chunks(response)
     except Exception as e:
-        return f"Error generating response: {e}"
+        yield f"Error generating response: {e}"
 
 def is_valid_email(email):
     return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
@@ -142,9 +159,8 @@ def chat_page():
     st.markdown("---")
     st.markdown("Ask me anything about **KynoHealth** based on their website!")
 
-    # Load context data
-    context = load_scraped_data()
-    if not context:
+    # Load the retrieval index over the scraped site
+    if not load_kyno_index().passages:
         st.warning("⚠️ No context data loaded. Please check kyno_scraped_data.txt file.")
 
     # Initialize chat history
@@ -170,8 +186,10 @@ def chat_page():
         # Generate and display assistant response
         with st.chat_message("assistant"):
             with st.spinner("Thinking... 🤔"):
-                answer = ask_question(user_input, context, st.session_state.get("role", "free"))
-                st.markdown(answer)
+                context = retrieve_context(user_input)
+            timer = streaming.StreamTimer(stream_question(user_input, context, st.session_state.get("role", "free")))
+            answer = st.write_stream(timer)
+            st.caption(timer.summary())
 
         st.session_state.chat_history.append({"role": "assistant", "content": answer})
 
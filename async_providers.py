@@ -0,0 +1,249 @@
+import abc
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+
+import ollama
+
+import chunking
+import concurrency
+import connectivity
+import metrics
+import model_health
+import ollama_session
+import providers
+import rate_limiter
+
+# Coroutine versions of the Gemini and Ollama providers, for fanning many
+# requests out from one event loop. They follow the same quota, cooldown,
+# rate-limit and concurrency rules as providers.py but never write to a
+# reporter: every call returns a ProviderResult. Chunked documents are
+# answered through them when LAWBOT_ASYNC_PROVIDERS=on; by default they keep
+# using one thread per part.
+ASYNC_FANOUT = os.getenv("LAWBOT_ASYNC_PROVIDERS", "off") == "on"
+
+
+class ProviderResult(namedtuple(
+    "ProviderResult",
+    ["text", "provider", "model", "seconds", "prompt_tokens", "completion_tokens", "error", "attempts"],
+    defaults=(None, None, None, None, ()),
+)):
+    """
+    Outcome of one request. attempts lists (model, outcome) for every model
+    tried, e.g. (("gemini-2.5-pro", "quota"), ("gemini-2.0-flash", "ok")).
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def fallback(self):
+        """True when the Gemini chain ran out and Ollama answered."""
+        return self.provider == providers.OLLAMA_PROVIDER and any(outcome != "ok" for _, outcome in self.attempts)
+
+    def as_response(self):
+        """The "[Response from: ...]" / "❌ ..." string the rest of the pipeline works with."""
+        if not self.ok:
+            return f"❌ {self.error}"
+        if self.provider == providers.OLLAMA_PROVIDER:
+            return f"[Response from: DeepSeek - {self.model}]\n\n{self.text}"
+        return f"[Response from: {self.model}]\n\n{self.text}"
+
+
+def _strip_think(text):
+    if "<think>" in text:
+        return text.split("</think>")[-1].strip()
+    return text
+
+
+class AsyncProvider(abc.ABC):
+    """Interface: generate() answers one prompt; generate_many() fans prompts out concurrently."""
+
+    name = None
+
+    @abc.abstractmethod
+    async def generate(self, prompt, temperature=None):
+        """Answers prompt; returns a ProviderResult and never raises for provider errors."""
+
+    async def generate_many(self, prompts, temperature=None, max_concurrency=None):
+        """Results in the order of prompts; at most max_concurrency requests are in flight."""
+        semaphore = asyncio.Semaphore(max_concurrency or concurrency.get_max_workers())
+
+        async def generate_one(prompt):
+            async with semaphore:
+                return await self.generate(prompt, temperature)
+
+        return await asyncio.gather(*(generate_one(prompt) for prompt in prompts))
+
+
+class AsyncOllamaProvider(AsyncProvider):
+    """
+    Uses ollama.AsyncClient with the keep-alive and context sizing of the
+    shared OllamaSession. Create it inside the event loop that will use it.
+    """
+
+    name = providers.OLLAMA_PROVIDER
+
+    def __init__(self, model, session=None):
+        self.model = model
+        self.session = session or ollama_session.get_session()
+        self.client = ollama.AsyncClient(host=self.session.host)
+
+    async def generate(self, prompt, temperature=None):
+        started = time.perf_counter()
+        if not await asyncio.to_thread(connectivity.get_monitor().is_online, "ollama"):
+            return ProviderResult(None, self.name, self.model, 0.0, error=f"Ollama is not reachable at {self.session.host}.",
+                                  attempts=((self.model, "offline"),))
+        try:
+            async with concurrency.model_slot_async(self.name, self.model):
+                with metrics.timed("llm_call", provider=self.name, model=self.model):
+                    response = await self.client.chat(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        options=self.session.options(self.model, prompt, temperature),
+                        keep_alive=self.session.keep_alive,
+                    )
+            self.session.record_timings(self.model, response)
+        except Exception as e:
+            return ProviderResult(None, self.name, self.model, time.perf_counter() - started,
+                                  error=f"Error generating response: {e}", attempts=((self.model, "error"),))
+        return ProviderResult(
+            _strip_think(response["message"]["content"]), self.name, self.model, time.perf_counter() - started,
+            prompt_tokens=ollama_session.response_field(response, "prompt_eval_count"),
+            completion_tokens=ollama_session.response_field(response, "eval_count"),
+            attempts=((self.model, "ok"),),
+        )
+
+
+class AsyncGeminiProvider(AsyncProvider):
+    """
+    Walks model_sequence like providers.get_gemini_response and hands the
+    prompt to fallback (an AsyncOllamaProvider) once every model is out of
+    quota. Rate-limit and slot waits are awaited; the google-generativeai
+    call itself runs on a worker thread, since its async client only works
+    over gRPC and stays bound to the first event loop that used it.
+    """
+
+    name = providers.GEMINI_PROVIDER
+
+    def __init__(self, api_key, model_sequence, fallback=None):
+        self.api_key = api_key
+        self.model_sequence = list(model_sequence or [])
+        self.fallback = fallback
+        providers.configure_gemini(api_key)
+
+    async def generate(self, prompt, temperature=None):
+        with metrics.timed("fallback_chain", provider=self.name) as labels:
+            result = await self._generate(prompt, temperature)
+            if not result.ok:
+                labels["outcome"] = "error"
+            elif result.fallback:
+                labels["outcome"] = "fallback"
+            return result
+
+    async def _generate(self, prompt, temperature):
+        started = time.perf_counter()
+        if not await asyncio.to_thread(connectivity.get_monitor().is_online, "gemini"):
+            return ProviderResult(None, self.name, None, 0.0, error="No internet connection.")
+        health = model_health.registry
+        limiter = rate_limiter.get_limiter()
+        estimated_tokens = chunking.estimate_tokens(prompt)
+        attempts = []
+        for model in self.model_sequence:
+            if not health.acquire(model):
+                metrics.observe("llm_call", 0.0, provider=self.name, model=model, outcome="cooldown_skip")
+                attempts.append((model, "cooldown_skip"))
+                continue
+            try:
+                with metrics.timed("rate_limit_wait", provider=self.name, model=model) as labels:
+                    try:
+                        await limiter.acquire_async(self.api_key, model, estimated_tokens)
+                    except rate_limiter.RateLimitTimeout:
+                        labels["outcome"] = "timeout"
+                        raise
+            except rate_limiter.RateLimitTimeout:
+                health.release(model)
+                attempts.append((model, "rate_limited"))
+                continue
+            try:
+                async with concurrency.model_slot_async(self.name, model):
+                    with metrics.timed("llm_call", provider=self.name, model=model) as labels:
+                        try:
+                            response = await asyncio.to_thread(
+                                providers.gemini_model(model, self.api_key).generate_content,
+                                prompt, generation_config={"temperature": temperature},
+                            )
+                            text = response.text
+                        except Exception as e:
+                            labels["outcome"] = "quota" if model_health.is_quota_error(e) else "error"
+                            raise
+            except Exception as e:
+                if model_health.is_quota_error(e):
+                    health.record_quota_error(model, e)
+                    attempts.append((model, "quota"))
+                    continue
+                health.release(model)
+                attempts.append((model, "error"))
+                return ProviderResult(None, self.name, model, time.perf_counter() - started,
+                                      error=f"Error with model {model}: {e}", attempts=tuple(attempts))
+            health.record_success(model)
+            attempts.append((model, "ok"))
+            usage = getattr(response, "usage_metadata", None)
+            total_tokens = getattr(usage, "total_token_count", None)
+            if total_tokens:
+                limiter.adjust(self.api_key, model, total_tokens - estimated_tokens)
+            return ProviderResult(
+                text, self.name, model, time.perf_counter() - started,
+                prompt_tokens=getattr(usage, "prompt_token_count", None),
+                completion_tokens=getattr(usage, "candidates_token_count", None),
+                attempts=tuple(attempts),
+            )
+
+        if self.fallback is None:
+            return ProviderResult(None, self.name, None, time.perf_counter() - started,
+                                  error="All configured Gemini models have failed.", attempts=tuple(attempts))
+        result = await self.fallback.generate(prompt, temperature)
+        return result._replace(seconds=time.perf_counter() - started, attempts=tuple(attempts) + result.attempts)
+
+
+def provider_from_settings(settings):
+    """The async provider for settings["model_provider"], with Ollama as the Gemini fallback."""
+    ollama_provider = AsyncOllamaProvider(settings["ollama_model"])
+    if settings["model_provider"] == providers.GEMINI_PROVIDER:
+        return AsyncGeminiProvider(settings.get("api_key"), settings.get("gemini_model_sequence", []), fallback=ollama_provider)
+    return ollama_provider
+
+
+def run(coroutine):
+    """Runs coroutine to completion from synchronous code, even if this thread already has a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    outcome = {}
+
+    def run_in_thread():
+        try:
+            outcome["result"] = asyncio.run(coroutine)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run_in_thread, name="async-providers")
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def generate_many(prompts, settings, max_concurrency=None):
+    """Synchronous entry point: answers every prompt from one event loop and returns ProviderResults in order."""
+
+    async def generate_all():
+        provider = provider_from_settings(settings)
+        return await provider.generate_many(prompts, settings.get("temperature"), max_concurrency)
+
+    return run(generate_all())
@@ -0,0 +1,284 @@
+"""
+Processes a folder of case-file subfolders without Streamlit, for cron jobs
+and worker boxes. Uses the same extraction, prompt, cache and provider logic
+as the "Process Folder" button and prints one JSON object per line:
+
+    {"event": "log", "level": "info", "message": "...", "time": ...}
+    {"event": "file_done", "subfolder": "...", "file": "...", "status": "ok", "seconds": 4.2, ...}
+    {"event": "summary", "files": 12, "succeeded": 11, "failed": 1, ...}
+
+    python batch_cli.py --input in/ --output out/ --completed done/ --question-ids Q_1,Q_3
+    python batch_cli.py --input in/ --output out/ --completed done/ --provider ollama \
+        --question "Who are the parties?" --concurrency 1
+
+Question IDs are looked up in the Gemini or Deep_seek table using the
+[supabase] section of .streamlit/secrets.toml (or SUPABASE_HOST, SUPABASE_PORT,
+SUPABASE_DATABASE, SUPABASE_USER and SUPABASE_PASSWORD). The Gemini API key
+comes from --api-key or GEMINI_API_KEY.
+
+Finished files are recorded in a manifest (--manifest, default
+run_manifest.sqlite3); rerunning after a crash skips files that already have
+an answer for the same content, questions and models.
+
+With --watch the command keeps running, answers files as they are copied
+into the input subfolders and prints a summary event per batch.
+
+Exit status: 0 when every file succeeded or there was nothing to process,
+1 when any file failed or was skipped or the provider was not reachable,
+2 for configuration errors.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+import concurrency
+import document_pipeline
+import folder_watcher
+import metrics
+import ollama_session
+import providers
+import run_manifest
+
+GEMINI_SEQUENCE_CONFIG_FILE = "gemini_sequence_config.json"
+DEFAULT_GEMINI_MODEL_SEQUENCE = ["gemini-2.5-pro-exp-03-25", "gemini-2.0-flash", "gemini-1.5-pro"]
+SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+QUESTION_TABLES = {"gemini": "Gemini", "ollama": "Deep_seek"}
+
+EXIT_OK = 0
+EXIT_PARTIAL_FAILURE = 1
+EXIT_CONFIG_ERROR = 2
+
+
+class ConfigError(Exception):
+    pass
+
+
+class JsonLinesReporter:
+    """Reporter for document_pipeline that prints each message as a JSON line."""
+
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def _log(self, level, message):
+        self.emit("log", level=level, message=str(message))
+
+    def info(self, message):
+        self._log("info", message)
+
+    def success(self, message):
+        self._log("success", message)
+
+    def warning(self, message):
+        self._log("warning", message)
+
+    def error(self, message):
+        self._log("error", message)
+
+    def caption(self, message):
+        self._log("info", message)
+
+    def markdown(self, message):
+        pass
+
+    def write_stream(self, chunks):
+        return "".join(chunks)
+
+
+def load_gemini_sequence():
+    try:
+        with open(GEMINI_SEQUENCE_CONFIG_FILE, "r") as f:
+            return json.load(f).get("gemini_model_sequence", DEFAULT_GEMINI_MODEL_SEQUENCE)
+    except (OSError, json.JSONDecodeError):
+        return DEFAULT_GEMINI_MODEL_SEQUENCE
+
+
+def load_database_settings():
+    settings = {}
+    if os.path.exists(SECRETS_FILE):
+        try:
+            import tomllib
+            with open(SECRETS_FILE, "rb") as f:
+                settings = tomllib.load(f).get("supabase", {})
+        except ImportError:
+            import toml
+            settings = toml.load(SECRETS_FILE).get("supabase", {})
+    for key in ("host", "port", "database", "user", "password"):
+        value = os.getenv(f"SUPABASE_{key.upper()}")
+        if value:
+            settings[key] = value
+    missing = [key for key in ("host", "port", "database", "user", "password") if not settings.get(key)]
+    if missing:
+        raise ConfigError(f"Database settings missing: {', '.join(missing)} (see {SECRETS_FILE})")
+    return settings
+
+
+def fetch_questions(question_ids, provider):
+    """Question texts for the given q_ids, in the order they were asked for."""
+    database = load_database_settings()
+    conn = psycopg2.connect(
+        host=database["host"],
+        port=database["port"],
+        dbname=database["database"],
+        user=database["user"],
+        password=database["password"],
+        sslmode="require"
+    )
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT q_id, ques FROM {QUESTION_TABLES[provider]} WHERE q_id = ANY(%s)", (list(question_ids),))
+        found = dict(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+    missing = [q_id for q_id in question_ids if q_id not in found]
+    if missing:
+        raise ConfigError(f"Unknown question IDs for {provider}: {', '.join(missing)}")
+    return [found[q_id] for q_id in question_ids]
+
+
+def split_list(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="folder whose subfolders hold the .html/.htm/.txt files")
+    parser.add_argument("--output", required=True, help="folder for the answer .txt files")
+    parser.add_argument("--completed", required=True, help="folder processed files are copied to")
+    parser.add_argument("--question-ids", help="comma-separated q_ids, e.g. Q_1,Q_3")
+    parser.add_argument("--question", action="append", default=[], help="literal question text (repeatable)")
+    parser.add_argument("--provider", choices=sorted(QUESTION_TABLES), default="gemini")
+    parser.add_argument("--models", help="comma-separated Gemini model sequence (default: gemini_sequence_config.json)")
+    parser.add_argument("--ollama-model", default="deepseek-r1:1.5b")
+    parser.add_argument("--temperature", type=float, default=0.5)
+    parser.add_argument("--api-key", default=None, help="Gemini API key (default: GEMINI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=None, help="parallel files (default: LAWBOT_MAX_CONCURRENCY)")
+    parser.add_argument("--pack", action="store_true", default=None, help="answer small files of a subfolder together in one request (default: LAWBOT_PACKING)")
+    parser.add_argument("--metrics-file", default=metrics.METRICS_FILE, help="write Prometheus stage timings here when the run ends")
+    parser.add_argument("--manifest", default=run_manifest.DEFAULT_MANIFEST_PATH, help="SQLite progress manifest used to resume runs")
+    parser.add_argument("--no-resume", action="store_true", help="answer every file again without reading or updating the manifest")
+    parser.add_argument("--watch", action="store_true", help="keep running and answer new files as they arrive (stop with Ctrl+C)")
+    return parser.parse_args(argv)
+
+
+def build_settings(args):
+    if not os.path.isdir(args.input):
+        raise ConfigError(f"Input folder does not exist: {args.input}")
+    api_key = args.api_key or os.getenv("GEMINI_API_KEY")
+    if args.provider == "gemini" and not api_key:
+        raise ConfigError("No Gemini API key: pass --api-key or set GEMINI_API_KEY")
+    questions = fetch_questions(split_list(args.question_ids), args.provider) if args.question_ids else []
+    questions += args.question
+    if not questions:
+        raise ConfigError("No questions: pass --question-ids and/or --question")
+    settings = {
+        "input_folder": args.input,
+        "output_folder": args.output,
+        "completed_folder": args.completed,
+        "model_provider": providers.GEMINI_PROVIDER if args.provider == "gemini" else providers.OLLAMA_PROVIDER,
+        "gemini_model_sequence": split_list(args.models) or load_gemini_sequence(),
+        "ollama_model": args.ollama_model,
+        "temperature": args.temperature,
+        "api_key": api_key,
+    }
+    return settings, questions
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    reporter = JsonLinesReporter()
+    try:
+        settings, questions = build_settings(args)
+    except (ConfigError, psycopg2.Error) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_CONFIG_ERROR
+
+    if args.concurrency:
+        concurrency.set_max_workers(args.concurrency)
+    reporter.emit(
+        "start", input=args.input, provider=settings["model_provider"],
+        questions=len(questions), max_workers=concurrency.get_max_workers()
+    )
+
+    if ollama_session.PRELOAD:
+        session = ollama_session.get_session()
+        if settings["model_provider"] == providers.OLLAMA_PROVIDER:
+            reporter.emit("model_load", model=settings["ollama_model"], seconds=session.preload(settings["ollama_model"]))
+        else:
+            # Only needed if the Gemini chain runs out, so it must not delay the first file
+            session.preload_in_background(settings["ollama_model"])
+
+    def file_done(job, finished, total):
+        if job.skipped:
+            status = "skipped"
+        elif job.error is not None or not job.result:
+            status = "failed"
+        else:
+            status = "ok"
+        reporter.emit(
+            "file_done",
+            subfolder=os.path.basename(job.subfolder),
+            file=os.path.basename(job.file_path),
+            status=status,
+            seconds=round(job.seconds, 3),
+            error=str(job.error) if job.error is not None else None,
+            finished=finished,
+            total=total,
+        )
+
+    if args.watch:
+        return watch(args, settings, questions, reporter)
+
+    manifest = None if args.no_resume else run_manifest.RunManifest(args.manifest)
+    summary = document_pipeline.run_folder(args.input, questions, settings, reporter, on_result=file_done, manifest=manifest, pack=args.pack)
+    if summary is None:
+        # Provider not reachable; an input folder with nothing new is a normal, successful run
+        reporter.emit("summary", files=0, succeeded=0, failed=0, skipped=0)
+        return EXIT_PARTIAL_FAILURE
+    reporter.emit("summary", **summary)
+    reporter.emit("stage_timings", stages=metrics.registry.summary())
+    if args.metrics_file:
+        metrics.registry.write_file(args.metrics_file)
+    return EXIT_OK if summary["failed"] == 0 and summary["skipped"] == 0 else EXIT_PARTIAL_FAILURE
+
+
+def watch(args, settings, questions, reporter):
+    """Watch mode: one summary event per batch of new files until interrupted."""
+    if args.no_resume:
+        reporter.emit("error", message="--watch relies on the manifest to skip answered files; drop --no-resume")
+        return EXIT_CONFIG_ERROR
+    watcher = folder_watcher.FolderWatcher(
+        settings, questions, reporter, manifest=run_manifest.RunManifest(args.manifest),
+        on_batch=lambda summary: reporter.emit("summary", **summary)
+    )
+    watcher.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop(timeout=30)
+        if args.metrics_file:
+            metrics.registry.write_file(args.metrics_file)
+    return EXIT_OK if watcher.stats["failed"] == 0 else EXIT_PARTIAL_FAILURE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
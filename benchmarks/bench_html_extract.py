@@ -0,0 +1,139 @@
+"""
+Compares the extract_text_from_html backends for speed and checks that every
+backend gives the same whitespace-normalized text as the reference
+html.parser implementation. Besides the synthetic judgments, the corpus
+always includes EDGE_CASES, pages that some backends are known to lose text
+on; the run fails only if the backend "auto" uses differs from the reference.
+
+    python benchmarks/bench_html_extract.py
+    python benchmarks/bench_html_extract.py --corpus path/to/html/files --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from text_extraction import available_parsers, extract_text_from_html, resolve_parser
+
+WORDS = (
+    "appellant respondent court judgment petition order section act tribunal "
+    "evidence counsel hearing decree plaintiff defendant bench statute appeal "
+    "clause contract witness affidavit jurisdiction limitation dismissed allowed"
+).split()
+
+
+# Exports that lost text with the lxml-based backends
+EDGE_CASES = {
+    "edge_text_after_html.html": "<html><body><p>Judgment</p></body></html>\nOrder pronounced in open court.",
+    "edge_cdata.html": "<html><body><p>Held: <![CDATA[appeal allowed with costs]]> as above.</p></body></html>",
+}
+
+
+def reference_extract(html_content):
+    """The original two-pass html.parser extractor, also dropping nav content."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for tag in soup(["script", "style", "nav"]):
+        tag.decompose()
+    return ' '.join(soup.get_text().split())
+
+
+def synthetic_judgment(paragraphs, seed):
+    """A court-judgment-like page with the noise real exports carry."""
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))).capitalize() + "."
+
+    body = []
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            body.append(f"<h2>PART {i // 25 + 1}</h2>")
+        if i % 40 == 7:
+            body.append("<table><tr><td>Case No.</td><td>%d/2023</td></tr><tr><td>Date</td><td>12&nbsp;May&nbsp;2023</td></tr></table>" % i)
+        if i % 30 == 11:
+            body.append("<script>var x = '%s';</script><!-- page break -->" % sentence())
+        body.append(
+            f"<p class='para'>{i + 1}. {sentence()} <b>{sentence()}</b> &amp; <i>{sentence()}</i>\n{sentence()}</p>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Judgment &ndash; Appeal</title>\n"
+        "<style>p { margin: 0 } .para { color: #333 }</style>\n"
+        "<script>window.analytics = {};</script></head>\n<body>\n"
+        "<nav><a href='/'>Home</a> | <a href='/cases'>Cases</a></nav>\n"
+        "<div id='judgment'>\n" + "\n".join(body) + "\n</div>\n"
+        "<footer>IN THE HIGH COURT &copy; 2023</footer></body></html>"
+    )
+
+
+def load_corpus(corpus_dir):
+    documents = {}
+    if corpus_dir:
+        for root, _, files in os.walk(corpus_dir):
+            for name in sorted(files):
+                if name.lower().endswith((".htm", ".html")):
+                    path = os.path.join(root, name)
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        documents[os.path.relpath(path, corpus_dir)] = f.read()
+    else:
+        for paragraphs in (10, 200, 2000, 10000):
+            documents[f"synthetic_{paragraphs}p.html"] = synthetic_judgment(paragraphs, paragraphs)
+    documents.update(EDGE_CASES)
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of .htm/.html files (default: synthetic judgments)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per document and backend")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus)
+    backends = available_parsers()
+    default_backend = resolve_parser("auto")
+    results = []
+    mismatches = {}
+
+    for name, html_content in documents.items():
+        expected = reference_extract(html_content)
+        for backend in ["reference"] + backends:
+            extract = reference_extract if backend == "reference" else (lambda html, b=backend: extract_text_from_html(html, parser=b))
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                text = extract(html_content)
+                timings.append(time.perf_counter() - started)
+            identical = text == expected
+            if not identical:
+                mismatches.setdefault(backend, []).append(name)
+            best = min(timings)
+            results.append({
+                "document": name,
+                "bytes": len(html_content.encode("utf-8")),
+                "backend": backend,
+                "best_seconds": round(best, 6),
+                "mb_per_second": round(len(html_content.encode("utf-8")) / best / 1e6, 2),
+                "identical": identical,
+            })
+            print(f"{name:<32} {backend:<12} {best * 1000:9.1f} ms  {'ok' if identical else 'MISMATCH'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    for backend, names in mismatches.items():
+        print(f"⚠ {backend} differs from the reference output on: {', '.join(names)}")
+    if default_backend in mismatches:
+        print(f"❌ The default backend ({default_backend}) differs from the reference output")
+        sys.exit(1)
+    print(f"✅ The default backend ({default_backend}) matches the reference output")
+
+
+if __name__ == "__main__":
+    main()
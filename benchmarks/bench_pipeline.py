@@ -0,0 +1,237 @@
+"""
+Offline micro-benchmarks for the CPU side of document processing:
+read_text, extract_text_from_html, read_txt_file, generate_prompt and
+output_file_name.
+
+A deterministic corpus of judgment-like HTML and TXT files is generated in
+several sizes and encodings (UTF-8, UTF-8 with BOM, Latin-1, Windows-1252), so runs on
+different commits measure the same input. Every case reports throughput
+and peak traced memory, and all results are written as JSON. Before timing
+anything, every corpus file and the DECODING_SAMPLES are read back through
+file_reader and compared with the original text; a mismatch fails the run.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --json after.json --compare before.json
+    python benchmarks/bench_pipeline.py --keep-corpus corpus/ --repeat 10
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_html_extract import WORDS, synthetic_judgment
+from document_pipeline import generate_prompt, output_file_name, read_txt_file
+from file_reader import decode_bytes, read_text
+from text_extraction import extract_text_from_html, resolve_parser
+
+SIZES = {"small": 10, "medium": 400, "large": 4000}
+TXT_ENCODINGS = ("utf-8", "utf-8-sig", "latin-1", "cp1252")
+QUESTIONS = [
+    "Who are the parties to the case?",
+    "What is the case number and the date of the judgment?",
+    "Which court delivered the judgment and who was on the bench?",
+    "What were the main issues framed by the court?",
+    "Which statutes and sections were relied on?",
+    "What was the final decision and relief granted?",
+    "Summarise the reasoning of the court in five sentences.",
+    "Were any costs awarded, and to whom?",
+]
+# Non-ASCII text that shows up in real exports; the Latin-1 files only get the first part
+LATIN1_EXTRAS = ["Hon'ble Mr. Justice Ramírez", "§ 34", "¶ 12", "Müller v. Société Générale"]
+CP1252_EXTRAS = LATIN1_EXTRAS + ["“quoted” — dash"]
+UTF8_EXTRAS = CP1252_EXTRAS + ["₹ 5,00,000", "न्यायालय"]
+
+
+# Short real-world strings in the single-byte encodings legal exports use;
+# encoding detectors tend to misread these as cp1250, Mac or UTF-16 text
+DECODING_SAMPLES = [
+    ("Señor Peña, año", "cp1252"),
+    ("Müller v. Straße", "latin-1"),
+    ("café", "latin-1"),
+    ("“Hon’ble” Justice — § 34 ¶ 12 €5,000", "cp1252"),
+    ("Société Générale v. Ramírez, décision du 12 mai", "latin-1"),
+    ("Señor Peña, año", "utf-8"),
+    ("₹ 5,00,000 न्यायालय", "utf-8-sig"),
+]
+
+
+def synthetic_text(paragraphs, seed, extras):
+    rng = random.Random(seed)
+    lines = ["IN THE HIGH COURT OF JUDICATURE", f"Civil Appeal No. {seed} of 2023", ""]
+    for i in range(paragraphs):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(30, 90))]
+        words.insert(rng.randrange(len(words)), rng.choice(extras))
+        lines.append(f"{i + 1}. " + " ".join(words).capitalize() + ".")
+        if i % 20 == 19:
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def build_corpus(directory):
+    """Writes the corpus and returns [(name, path, kind, encoding)]."""
+    corpus = []
+    for size, paragraphs in SIZES.items():
+        name = f"HN{paragraphs}_{size}.html"
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_judgment(paragraphs, paragraphs))
+        corpus.append((name, path, "html", "utf-8"))
+        for encoding in TXT_ENCODINGS:
+            extras = {"latin-1": LATIN1_EXTRAS, "cp1252": CP1252_EXTRAS}.get(encoding, UTF8_EXTRAS)
+            name = f"YB{paragraphs}_{size}_{encoding.replace('-', '')}.txt"
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding=encoding) as f:
+                f.write(synthetic_text(paragraphs, paragraphs, extras))
+            corpus.append((name, path, "txt", encoding))
+    return corpus
+
+
+def check_decoding(corpus):
+    """Reads every TXT corpus file and DECODING_SAMPLES back; returns the number that came out different."""
+    failures = 0
+    cases = [(text, encoding, text.encode(encoding)) for text, encoding in DECODING_SAMPLES]
+    for name, path, kind, encoding in corpus:
+        if kind == "txt":
+            with open(path, "r", encoding=encoding) as f:
+                expected = f.read()
+            if read_txt_file(path) != expected:
+                failures += 1
+                print(f"❌ read_txt_file garbled {name} ({encoding})")
+    for text, encoding, data in cases:
+        decoded = decode_bytes(data, "sample")
+        if decoded != text:
+            failures += 1
+            print(f"❌ {text!r} in {encoding} was read as {decoded!r}")
+    print(f"{'✅' if not failures else '❌'} Decoding check: {len(cases) + sum(kind == 'txt' for *_, kind, _ in corpus)} inputs, {failures} garbled")
+    return failures
+
+
+def measure(function, argument, repeat):
+    """Best wall time over `repeat` runs, then one traced run for peak memory."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(argument)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    function(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(corpus, repeat):
+    results = []
+
+    def record(case, document, input_bytes, seconds, peak, operations=1):
+        results.append({
+            "case": case,
+            "document": document,
+            "input_bytes": input_bytes,
+            "best_seconds": round(seconds, 6),
+            "mb_per_second": round(input_bytes / seconds / 1e6, 2) if seconds else None,
+            "operations_per_second": round(operations / seconds, 1) if seconds else None,
+            "peak_memory_bytes": peak,
+        })
+        print(f"{case:<24} {document:<36} {seconds * 1000:9.2f} ms  {peak / 1024:9.0f} KiB peak")
+
+    for name, path, kind, encoding in corpus:
+        file_bytes = os.path.getsize(path)
+        if kind == "html":
+            html_content, seconds, peak = measure(lambda html_path: read_text(html_path, html=True), path, repeat)
+            record("read_text", name, file_bytes, seconds, peak)
+            text, seconds, peak = measure(extract_text_from_html, html_content, repeat)
+            record("extract_text_from_html", name, file_bytes, seconds, peak)
+        else:
+            text, seconds, peak = measure(read_txt_file, path, repeat)
+            record("read_txt_file", name, file_bytes, seconds, peak)
+        prompt_bytes = len(text.encode("utf-8"))
+        _, seconds, peak = measure(lambda extracted: generate_prompt(extracted, QUESTIONS), text, repeat)
+        record("generate_prompt", name, prompt_bytes, seconds, peak)
+
+    rng = random.Random(0)
+    file_names = [
+        f"{rng.choice(['HN', 'YB', 'YBm', 'CA'])}{rng.randint(1, 99999)}{rng.choice(['', '_' + str(rng.randint(1, 9999))])}"
+        f"{rng.choice(['.html', '.htm', '.txt'])}"
+        for _ in range(20000)
+    ]
+    _, seconds, peak = measure(lambda names: [output_file_name(name) for name in names], file_names, repeat)
+    record("output_file_name", f"{len(file_names)} names", sum(len(name) for name in file_names), seconds, peak, len(file_names))
+    return results
+
+
+def compare(results, baseline_path, max_regression):
+    """Prints throughput changes against a baseline file; returns the number of regressions."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(row["case"], row["document"]): row for row in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        before = baseline.get((row["case"], row["document"]))
+        if not before or not before["best_seconds"]:
+            continue
+        change = before["best_seconds"] / row["best_seconds"] - 1 if row["best_seconds"] else 0.0
+        slower = change < -max_regression
+        regressions += slower
+        print(f"{row['case']:<24} {row['document']:<36} {change * 100:+7.1f}% throughput{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (the best one is kept)")
+    parser.add_argument("--json", default="bench_pipeline.json", help="Where to write the results")
+    parser.add_argument("--keep-corpus", help="Write the generated corpus to this directory and keep it")
+    parser.add_argument("--compare", help="Earlier results file to compare throughput with")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed throughput drop before --compare fails")
+    args = parser.parse_args()
+
+    corpus_dir = args.keep_corpus or tempfile.mkdtemp(prefix="lawbot_bench_")
+    os.makedirs(corpus_dir, exist_ok=True)
+    try:
+        corpus = build_corpus(corpus_dir)
+        garbled = check_decoding(corpus)
+        results = run(corpus, args.repeat)
+    finally:
+        if not args.keep_corpus:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "html_parser": resolve_parser(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📝 Results written to {args.json}")
+
+    if garbled or (args.compare and compare(results, args.compare, args.max_regression)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
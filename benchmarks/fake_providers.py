@@ -0,0 +1,347 @@
+"""
+Local stand-ins for the Gemini REST API and the Ollama API, for load tests
+that must not spend real quota. Latency, quota-error rate and answer size
+are configurable; answers follow the prompt's "Task N" and "DOCUMENT N"
+structure so incremental, chunked and packed requests parse as usual.
+
+Run them and point the app (or batch_cli.py) at them:
+
+    python benchmarks/fake_providers.py --gemini-port 8701 --ollama-port 8702 \\
+        --gemini-latency 2,8 --quota-rates gemini-2.5-pro-exp-03-25=0.3
+    LAWBOT_GEMINI_ENDPOINT=http://127.0.0.1:8701 OLLAMA_HOST=http://127.0.0.1:8702 streamlit run Chat.py
+
+benchmarks/load_harness.py starts them in-process.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the court held that appellant respondent section act evidence judgment order petition "
+    "contract liability damages relief costs appeal dismissed allowed tribunal statute notice"
+).split()
+TASK_PATTERN = re.compile(r"Task (\d+):")
+DOCUMENT_PATTERN = re.compile(r"BEGIN DOCUMENT (\d+)")
+
+
+class Latency:
+    """Log-normal latency given by its median and 95th percentile, in seconds."""
+
+    def __init__(self, median, p95=None):
+        self.median = median
+        p95 = p95 if p95 is not None else median
+        self.sigma = math.log(p95 / median) / 1.645 if median > 0 and p95 > median else 0.0
+
+    @classmethod
+    def parse(cls, value):
+        """Parses "median" or "median,p95"."""
+        parts = [float(part) for part in value.split(",")]
+        return cls(*parts[:2])
+
+    def sample(self, rng):
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0, self.sigma)) if self.sigma else self.median
+
+
+class FakeBehaviour:
+    """What the stand-ins do; shared by both servers and safe to change while they run."""
+
+    def __init__(self, gemini_latency=None, ollama_latency=None, quota_rate=0.0, quota_rates=None,
+                 error_rate=0.0, answer_words=(40, 160), retry_after=5.0, ollama_load_seconds=0.0, seed=0):
+        self.gemini_latency = gemini_latency or Latency(1.0, 3.0)
+        self.ollama_latency = ollama_latency or Latency(3.0, 8.0)
+        self.quota_rate = quota_rate
+        self.quota_rates = dict(quota_rates or {})
+        self.error_rate = error_rate
+        self.answer_words = answer_words
+        self.retry_after = retry_after
+        self.ollama_load_seconds = ollama_load_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._loaded_until = {}  # Ollama model -> time it gets unloaded
+        self.counters = {}
+
+    def count(self, name, model):
+        with self._lock:
+            key = f"{name}:{model}"
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def roll(self, rate):
+        with self._lock:
+            return self._rng.random() < rate
+
+    def latency(self, distribution):
+        with self._lock:
+            return distribution.sample(self._rng)
+
+    def quota_exceeded(self, model):
+        return self.roll(self.quota_rates.get(model, self.quota_rate))
+
+    def load_model(self, model, keep_alive):
+        """Seconds spent loading an Ollama model that was not resident, then keeps it for keep_alive."""
+        now = time.monotonic()
+        with self._lock:
+            cold = self._loaded_until.get(model, 0) < now
+        load_seconds = self.ollama_load_seconds if cold else 0.0
+        if load_seconds:
+            time.sleep(load_seconds)
+        with self._lock:
+            self._loaded_until[model] = time.monotonic() + parse_keep_alive(keep_alive)
+        return load_seconds
+
+    def answer(self, prompt):
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        low, high = self.answer_words
+
+        def paragraph():
+            return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+        tasks = sorted({int(number) for number in TASK_PATTERN.findall(prompt)})
+        body = "\n\n".join(f"### Task {number}\n{paragraph()}" for number in tasks) if tasks else paragraph()
+        documents = sorted({int(number) for number in DOCUMENT_PATTERN.findall(prompt)})
+        if documents:
+            body = "\n\n".join(
+                f"===== BEGIN ANSWER {number} =====\n{body}\n===== END ANSWER {number} =====" for number in documents
+            )
+        return body
+
+
+def parse_keep_alive(value):
+    """Ollama keep_alive ("5m", "30s", "1h", seconds, or negative for forever) in seconds."""
+    if value is None or value == "":
+        return 300.0
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?", str(value).strip())
+        if not match:
+            return 300.0
+        seconds = float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[match.group(2) or "s"]
+    return float("inf") if seconds < 0 else seconds
+
+
+def pieces(text, count=8):
+    """Splits text into roughly `count` stream chunks on word boundaries."""
+    words = text.split(" ")
+    size = max(1, math.ceil(len(words) / count))
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    behaviour = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_lines(self, content_type, lines, delay):
+        # HTTP/1.0 without Content-Length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        for line in lines:
+            self.wfile.write(line.encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(delay)
+
+    def do_GET(self):
+        self.send_json(200, {"status": "fake"})
+
+
+class GeminiHandler(_Handler):
+    """POST /v1beta/models/{model}:generateContent and :streamGenerateContent."""
+
+    def do_POST(self):
+        match = re.match(r"^/v1(?:beta)?/models/([^:/]+):(generateContent|streamGenerateContent)", self.path)
+        if not match:
+            self.send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+            return
+        model, method = match.groups()
+        request = self.read_json()
+        behaviour = self.behaviour
+        prompt = "".join(part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", []))
+        behaviour.count("requests", model)
+        delay = behaviour.latency(behaviour.gemini_latency)
+
+        if behaviour.quota_exceeded(model):
+            behaviour.count("quota_errors", model)
+            time.sleep(min(delay, 0.2))
+            self.send_json(429, {"error": {
+                "code": 429,
+                "message": f"Resource has been exhausted (e.g. check quota). Please retry in {behaviour.retry_after:g}s.",
+                "status": "RESOURCE_EXHAUSTED",
+            }})
+            return
+        if behaviour.roll(behaviour.error_rate):
+            behaviour.count("errors", model)
+            time.sleep(delay)
+            self.send_json(500, {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}})
+            return
+
+        text = behaviour.answer(prompt)
+        usage = {"promptTokenCount": estimate_tokens(prompt), "candidatesTokenCount": estimate_tokens(text)}
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+
+        def candidate(chunk):
+            return {"candidates": [{"content": {"parts": [{"text": chunk}], "role": "model"}, "index": 0}]}
+
+        if method == "generateContent":
+            time.sleep(delay)
+            payload = candidate(text)
+            payload["candidates"][0]["finishReason"] = "STOP"
+            payload["usageMetadata"] = usage
+            self.send_json(200, payload)
+            return
+        # The REST client reads a streamed JSON array of GenerateContentResponse objects
+        chunks = [candidate(chunk) for chunk in pieces(text)]
+        chunks[-1]["candidates"][0]["finishReason"] = "STOP"
+        chunks[-1]["usageMetadata"] = usage
+        lines = ["[" + json.dumps(chunks[0])] + ["," + json.dumps(chunk) for chunk in chunks[1:]] + ["]"]
+        self.stream_lines("application/json", lines, delay / len(lines))
+
+
+class OllamaHandler(_Handler):
+    """POST /api/chat and /api/generate, GET /api/tags and /api/version."""
+
+    def do_GET(self):
+        if self.path.startswith("/api/version"):
+            self.send_json(200, {"version": "0.0.0-fake"})
+        elif self.path.startswith("/api/tags"):
+            self.send_json(200, {"models": []})
+        else:
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"Ollama is running")
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        request = self.read_json()
+        behaviour = self.behaviour
+        model = request.get("model", "")
+        behaviour.count("requests", model)
+        load_seconds = behaviour.load_model(model, request.get("keep_alive"))
+        chat = self.path == "/api/chat"
+        prompt = "".join(message.get("content", "") for message in request.get("messages", [])) if chat else request.get("prompt", "")
+        if not chat and not prompt:
+            # An empty generate request only loads the model
+            self.send_json(200, {"model": model, "created_at": _now(), "response": "", "done": True, "done_reason": "load",
+                                 "load_duration": int(load_seconds * 1e9)})
+            return
+        delay = behaviour.latency(behaviour.ollama_latency)
+        if behaviour.roll(behaviour.error_rate):
+            behaviour.count("errors", model)
+            time.sleep(delay)
+            self.send_json(500, {"error": "model runner has unexpectedly stopped"})
+            return
+
+        text = "<think>\nLet me read the document.\n</think>\n\n" + behaviour.answer(prompt)
+        final = {
+            "model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+            "total_duration": int((delay + load_seconds) * 1e9), "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": estimate_tokens(prompt), "eval_count": estimate_tokens(text),
+            "eval_duration": int(delay * 1e9),
+        }
+
+        def message(chunk):
+            return {"message": {"role": "assistant", "content": chunk}} if chat else {"response": chunk}
+
+        if not request.get("stream", True):
+            time.sleep(delay)
+            self.send_json(200, dict(final, **message(text)))
+            return
+        lines = [json.dumps(dict({"model": model, "created_at": _now(), "done": False}, **message(chunk))) + "\n" for chunk in pieces(text)]
+        lines.append(json.dumps(dict(final, **message(""))) + "\n")
+        self.stream_lines("application/x-ndjson", lines, delay / len(lines))
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def start_server(handler, behaviour, port=0, host="127.0.0.1"):
+    """Serves handler on a daemon thread; returns (server, base URL)."""
+    handler_class = type(handler.__name__, (handler,), {"behaviour": behaviour})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"fake-{handler.__name__}", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_rates(value):
+    """Parses "model=0.3,other=0.1" into {"model": 0.3, "other": 0.1}."""
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            model, rate = item.split("=", 1)
+            rates[model.strip()] = float(rate)
+    return rates
+
+
+def add_behaviour_arguments(parser):
+    parser.add_argument("--gemini-latency", type=Latency.parse, default=Latency(1.0, 3.0), help="Gemini latency median[,p95] in seconds")
+    parser.add_argument("--ollama-latency", type=Latency.parse, default=Latency(3.0, 8.0), help="Ollama latency median[,p95] in seconds")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="Share of Gemini requests answered with a 429 quota error")
+    parser.add_argument("--quota-rates", type=parse_rates, default={}, help="Per-model quota error shares, e.g. gemini-2.0-flash=0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500 error")
+    parser.add_argument("--answer-words", type=lambda value: tuple(int(part) for part in value.split(",")), default=(40, 160),
+                        help="Words per answered task, min,max")
+    parser.add_argument("--retry-after", type=float, default=5.0, help="Retry hint in quota error messages, seconds")
+    parser.add_argument("--ollama-load-seconds", type=float, default=0.0, help="Extra delay when an Ollama model is not resident")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def behaviour_from_args(args):
+    return FakeBehaviour(
+        gemini_latency=args.gemini_latency, ollama_latency=args.ollama_latency,
+        quota_rate=args.quota_rate, quota_rates=args.quota_rates, error_rate=args.error_rate,
+        answer_words=args.answer_words, retry_after=args.retry_after,
+        ollama_load_seconds=args.ollama_load_seconds, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--gemini-port", type=int, default=8701)
+    parser.add_argument("--ollama-port", type=int, default=8702)
+    add_behaviour_arguments(parser)
+    args = parser.parse_args()
+
+    behaviour = behaviour_from_args(args)
+    _, gemini_url = start_server(GeminiHandler, behaviour, args.gemini_port, args.host)
+    _, ollama_url = start_server(OllamaHandler, behaviour, args.ollama_port, args.host)
+    print(f"LAWBOT_GEMINI_ENDPOINT={gemini_url} OLLAMA_HOST={ollama_url}")
+    try:
+        while True:
+            time.sleep(30)
+            print(json.dumps(behaviour.counters, sort_keys=True))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+End-to-end load test of the folder pipeline (document_pipeline.run_folder)
+against the fake Gemini and Ollama servers from fake_providers.py, so the
+fallback chain, rate limiter and concurrency settings can be exercised
+without spending quota.
+
+A synthetic input tree of judgment-like HTML and TXT files is generated,
+processed with a throwaway response cache, and the run is reported as files
+per minute, per-file latency percentiles and fallback / quota-error counts.
+
+    python benchmarks/load_harness.py --files 200 --concurrency 8
+    python benchmarks/load_harness.py --quota-rates gemini-2.5-pro-exp-03-25=0.5 --rpm 60 --json run.json
+    python benchmarks/load_harness.py --provider ollama --ollama-latency 4,12 --ollama-load-seconds 10
+
+Pass --gemini-endpoint/--ollama-endpoint to use servers that are already
+running instead of in-process ones.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_providers
+from bench_html_extract import synthetic_judgment
+
+DEFAULT_MODELS = "gemini-2.5-pro-exp-03-25,gemini-2.0-flash,gemini-1.5-pro"
+QUESTIONS = [
+    "Who are the parties to the case?",
+    "Which court delivered the judgment and on what date?",
+    "What were the main issues framed by the court?",
+    "What was the final decision and relief granted?",
+]
+
+
+class CountingReporter:
+    """Reporter that counts messages per level and only prints them with --verbose."""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def _log(self, level, message):
+        with self._lock:
+            self.counts[level] = self.counts.get(level, 0) + 1
+        if self.verbose:
+            print(f"[{level}] {message}", file=sys.stderr)
+
+    def info(self, message):
+        self._log("info", message)
+
+    def success(self, message):
+        self._log("success", message)
+
+    def warning(self, message):
+        self._log("warning", message)
+
+    def error(self, message):
+        self._log("error", message)
+
+    def caption(self, message):
+        self._log("info", message)
+
+    def markdown(self, message):
+        pass
+
+    def write_stream(self, chunks):
+        return "".join(chunks)
+
+
+def build_tree(root, files, subfolders, seed):
+    """input/<subfolder>/ with `files` documents of mixed size and type; returns the input folder."""
+    # bench_pipeline imports the pipeline, so it is only imported once the endpoints are set
+    from bench_pipeline import UTF8_EXTRAS, synthetic_text
+
+    rng = random.Random(seed)
+    input_folder = os.path.join(root, "input")
+    for number in range(files):
+        subfolder = os.path.join(input_folder, f"batch_{number % subfolders:03d}")
+        os.makedirs(subfolder, exist_ok=True)
+        # Mostly short judgments with a long tail, as in real exports
+        paragraphs = min(int(rng.paretovariate(1.2) * 15), 1500)
+        if rng.random() < 0.7:
+            with open(os.path.join(subfolder, f"HN{number}_judgment.html"), "w", encoding="utf-8") as f:
+                f.write(synthetic_judgment(paragraphs, seed + number))
+        else:
+            with open(os.path.join(subfolder, f"YB{number}_judgment.txt"), "w", encoding="utf-8") as f:
+                f.write(synthetic_text(paragraphs, seed + number, UTF8_EXTRAS))
+    return input_folder
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def stage_count(rows, stage, outcome):
+    return sum(row["count"] for row in rows if row["stage"] == stage and row["outcome"] == outcome)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=60, help="Documents in the synthetic input tree")
+    parser.add_argument("--subfolders", type=int, default=4)
+    parser.add_argument("--provider", choices=("gemini", "ollama"), default="gemini")
+    parser.add_argument("--models", default=DEFAULT_MODELS, help="Gemini model sequence")
+    parser.add_argument("--ollama-model", default="deepseek-r1:1.5b")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel files (default: LAWBOT_MAX_CONCURRENCY)")
+    parser.add_argument("--pack", action="store_true", default=None, help="Pack small files into multi-document requests")
+    parser.add_argument("--rpm", type=int, default=600, help="Requests per minute allowed per Gemini model")
+    parser.add_argument("--tpm", type=int, default=10_000_000, help="Tokens per minute allowed per Gemini model")
+    parser.add_argument("--quota-cooldown", type=float, default=5.0, help="Seconds a model is skipped after a quota error")
+    parser.add_argument("--gemini-endpoint", help="Use this running Gemini stand-in instead of an in-process one")
+    parser.add_argument("--ollama-endpoint", help="Use this running Ollama stand-in instead of an in-process one")
+    parser.add_argument("--keep-tree", help="Build the input/output/completed folders here and keep them")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Print the pipeline's messages to stderr")
+    fake_providers.add_behaviour_arguments(parser)
+    args = parser.parse_args()
+
+    behaviour = fake_providers.behaviour_from_args(args)
+    gemini_url = args.gemini_endpoint or fake_providers.start_server(fake_providers.GeminiHandler, behaviour)[1]
+    ollama_url = args.ollama_endpoint or fake_providers.start_server(fake_providers.OllamaHandler, behaviour)[1]
+    root = args.keep_tree or tempfile.mkdtemp(prefix="lawbot_load_")
+    os.makedirs(root, exist_ok=True)
+    # The ollama client and the connectivity monitor read these when imported
+    os.environ["LAWBOT_GEMINI_ENDPOINT"] = gemini_url
+    os.environ["OLLAMA_HOST"] = ollama_url
+    os.environ["LAWBOT_RESPONSE_CACHE_PATH"] = os.path.join(root, "response_cache.sqlite3")
+
+    import concurrency
+    import document_pipeline
+    import metrics
+    import model_health
+    import providers
+    import rate_limiter
+
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    rate_limiter.set_limiter(rate_limiter.RateLimiter(
+        limits={model: {"rpm": args.rpm, "tpm": args.tpm} for model in models},
+    ))
+    model_health.registry.default_cooldown = args.quota_cooldown
+    if args.concurrency:
+        concurrency.set_max_workers(args.concurrency)
+
+    try:
+        input_folder = build_tree(root, args.files, args.subfolders, args.seed)
+        settings = {
+            "input_folder": input_folder,
+            "output_folder": os.path.join(root, "output"),
+            "completed_folder": os.path.join(root, "completed"),
+            "model_provider": providers.GEMINI_PROVIDER if args.provider == "gemini" else providers.OLLAMA_PROVIDER,
+            "gemini_model_sequence": models,
+            "ollama_model": args.ollama_model,
+            "temperature": 0.5,
+            "api_key": "fake-load-test-key",
+        }
+        reporter = CountingReporter(args.verbose)
+        latencies = []
+
+        def file_done(job, finished, total):
+            if not job.skipped:
+                latencies.append(job.seconds)
+            if finished % max(1, total // 10) == 0 or finished == total:
+                print(f"  {finished}/{total} files", file=sys.stderr)
+
+        print(f"Gemini: {gemini_url}  Ollama: {ollama_url}  workers: {concurrency.get_max_workers()}", file=sys.stderr)
+        summary = document_pipeline.run_folder(
+            input_folder, QUESTIONS, settings, reporter, on_result=file_done, manifest=None, pack=args.pack
+        )
+    finally:
+        if not args.keep_tree:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if summary is None:
+        print("❌ The pipeline did not run (provider unreachable or no input)")
+        sys.exit(1)
+    stages = metrics.registry.summary()
+    report = {
+        "files": summary["files"],
+        "succeeded": summary["succeeded"],
+        "failed": summary["failed"],
+        "skipped": summary["skipped"],
+        "seconds": summary["seconds"],
+        "files_per_minute": round(summary["succeeded"] / summary["seconds"] * 60, 1) if summary["seconds"] else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p90": round(percentile(latencies, 0.90), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "fallbacks_to_ollama": stage_count(stages, "fallback_chain", "fallback"),
+        "quota_errors": stage_count(stages, "llm_call", "quota"),
+        "cooldown_skips": stage_count(stages, "llm_call", "cooldown_skip"),
+        "rate_limit_timeouts": stage_count(stages, "rate_limit_wait", "timeout"),
+        "server_counters": dict(sorted(behaviour.counters.items())),
+        "reporter_messages": reporter.counts,
+        "stages": stages,
+    }
+
+    print(f"{report['succeeded']}/{report['files']} files in {report['seconds']:.1f}s "
+          f"({report['files_per_minute']} files/min, {report['failed']} failed, {report['skipped']} skipped)")
+    latency = report["latency_seconds"]
+    print(f"latency per file: p50 {latency['p50']}s  p90 {latency['p90']}s  p99 {latency['p99']}s  max {latency['max']}s")
+    print(f"fallbacks to Ollama: {report['fallbacks_to_ollama']}  quota errors: {report['quota_errors']}  "
+          f"cooldown skips: {report['cooldown_skips']}  rate-limit timeouts: {report['rate_limit_timeouts']}")
+    for row in stages:
+        if row["stage"] in ("llm_call", "rate_limit_wait", "fallback_chain"):
+            print(f"  {row['stage']:<16} {row['model'] or row['provider']:<28} {row['outcome']:<14} "
+                  f"n={row['count']:<5} mean {row['mean_seconds']}s  p95 <= {row['p95_seconds']}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Documents whose estimated size exceeds the model's chunk budget are answered
+# part by part ("map") and the partial answers merged in a final call ("reduce").
+CHUNKING_MODE = os.getenv("LAWBOT_CHUNKING", "auto")  # auto | always | off
+DEFAULT_CHUNK_TOKENS = int(os.getenv("LAWBOT_CHUNK_TOKENS", "60000"))
+MODEL_CHUNK_TOKENS = {
+    "deepseek-r1:1.5b": 3000,
+}
+MAX_CHUNK_WORKERS = int(os.getenv("LAWBOT_CHUNK_WORKERS", "4"))
+CHARS_PER_TOKEN = 4
+
+# Coarsest boundary first: blank lines, lines, numbered paragraphs ("12. ",
+# "(3) "), sentence ends, then plain spaces
+SEPARATORS = [
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.;:])\s+(?=\(?\d{1,3}[.)]\s)"),
+    re.compile(r"(?<=[.!?])\s+"),
+    re.compile(r"\s+"),
+]
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def chunk_budget(models):
+    """Smallest chunk budget among the models that may answer a chunk."""
+    budgets = [MODEL_CHUNK_TOKENS.get(model, DEFAULT_CHUNK_TOKENS) for model in models if model]
+    return min(budgets) if budgets else DEFAULT_CHUNK_TOKENS
+
+
+def should_chunk(text, budget, mode=None):
+    mode = mode or CHUNKING_MODE
+    if mode == "off":
+        return False
+    if mode == "always":
+        return True
+    return estimate_tokens(text) > budget
+
+
+def split_text(text, max_tokens):
+    """Splits text into chunks of at most max_tokens, preferring structural boundaries."""
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    return [chunk for chunk in _split(text.strip(), max_chars, 0) if chunk.strip()]
+
+
+def _split(text, max_chars, level):
+    if len(text) <= max_chars:
+        return [text]
+    if level >= len(SEPARATORS):
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    chunks = []
+    current = ""
+    for piece in _split_keeping_separators(text, SEPARATORS[level]):
+        if len(piece) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split(piece, max_chars, level + 1))
+        elif len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_keeping_separators(text, separator):
+    pieces = []
+    start = 0
+    for match in separator.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece]
+
+
+def generate_chunk_prompt(chunk, part, total_parts, selected_questions):
+    prompt = f"""
+    ## AI Assistant for Legal Document Analysis
+    The document is too long to analyse at once. This is part {part} of {total_parts}.
+    Extracted Text (part {part} of {total_parts}):
+    {chunk}
+    """
+    prompt += "\n### Selected Tasks:\n"
+    for idx, question in enumerate(selected_questions, 1):
+        prompt += f"✅ Task {idx}: {question}\n"
+    prompt += "\n\n*Instructions:*\n"
+    prompt += "- Answer each task using only this part of the document.\n"
+    prompt += "- Quote paragraph numbers, names, dates and amounts exactly as they appear.\n"
+    prompt += "- If this part does not contain the answer to a task, state 'Not found in this part.'\n"
+    return prompt
+
+
+def generate_merge_prompt(partial_answers, selected_questions):
+    prompt = """
+    ## AI Assistant for Legal Document Analysis
+    A long document was analysed in parts. Below are the answers found in each part.
+    """
+    for part, answer in enumerate(partial_answers, 1):
+        prompt += f"\n### Answers from part {part}:\n{answer}\n"
+    prompt += "\n### Selected Tasks:\n"
+    for idx, question in enumerate(selected_questions, 1):
+        prompt += f"✅ Task {idx}: {question}\n"
+    prompt += "\n\n*Instructions:*\n"
+    prompt += "- Combine the partial answers into one final answer for each task, in task order.\n"
+    prompt += "- Ignore parts that state 'Not found in this part.' and remove duplicates.\n"
+    prompt += "- If the parts disagree, give the best supported answer and mention the conflict.\n"
+    prompt += "- If no part answers a task, state 'Information not available.'\n"
+    return prompt
+
+
+def map_reduce(text, selected_questions, ask, budget, max_workers=None, initializer=None, ask_many=None):
+    """
+    Answers selected_questions over text chunk by chunk.
+
+    ask(prompt) returns the model's answer text or raises. Chunks are answered
+    concurrently on up to max_workers threads (each thread is set up with
+    initializer), then merged; if the partial answers are themselves too big
+    for one merge prompt they are merged in groups, repeatedly. When
+    ask_many(prompts) is given, each round of prompts is handed to it
+    instead and it returns the answers in order.
+    Returns (final_answer, number_of_chunks).
+    """
+    chunks = split_text(text, budget) or [text]
+    prompts = [
+        generate_chunk_prompt(chunk, part, len(chunks), selected_questions)
+        for part, chunk in enumerate(chunks, 1)
+    ]
+    if ask_many is not None:
+        answers = ask_many(prompts)
+        while len(answers) > 1:
+            groups = _group_for_merge(answers, budget)
+            answers = ask_many([generate_merge_prompt(group, selected_questions) for group in groups])
+        return answers[0], len(chunks)
+
+    workers = max(1, min(max_workers or MAX_CHUNK_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        answers = list(executor.map(ask, prompts))
+
+        while len(answers) > 1:
+            groups = _group_for_merge(answers, budget)
+            answers = list(executor.map(lambda group: ask(generate_merge_prompt(group, selected_questions)), groups))
+    return answers[0], len(chunks)
+
+
+def _group_for_merge(answers, budget):
+    groups = [[]]
+    size = 0
+    for answer in answers:
+        tokens = estimate_tokens(answer)
+        if groups[-1] and size + tokens > budget:
+            groups.append([])
+            size = 0
+        groups[-1].append(answer)
+        size += tokens
+    if len(groups) == len(answers) and len(groups) > 1:
+        # Every answer alone fills the budget; merge pairwise so the loop still converges
+        groups = [answers[i:i + 2] for i in range(0, len(answers), 2)]
+    return groups
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager, contextmanager
+
+# Process-wide concurrency settings. They live in an imported module (not in
+# Chat.py, which Streamlit re-executes on every rerun) so that every session
+# and batch run shares the same limits.
+DEFAULT_MAX_WORKERS = int(os.getenv("LAWBOT_MAX_CONCURRENCY", "4"))
+DEFAULT_PROVIDER_LIMITS = {
+    "Google Gemini": int(os.getenv("LAWBOT_GEMINI_CONCURRENCY", "4")),
+    "DeepSeek (Ollama)": int(os.getenv("LAWBOT_OLLAMA_CONCURRENCY", "1")),
+}
+
+JobResult = namedtuple("JobResult", ["subfolder", "file_path", "result", "error", "skipped", "seconds"])
+
+
+class SlotLimiter:
+    """Counting semaphore whose limit can be changed while it is in use."""
+
+    def __init__(self, limit):
+        self._limit = max(1, int(limit))
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def set_limit(self, limit):
+        with self._cond:
+            self._limit = max(1, int(limit))
+            self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use >= self._limit:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+    def try_acquire(self):
+        """Takes a slot if one is free right now; never waits."""
+        with self._cond:
+            if self._in_use >= self._limit:
+                return False
+            self._in_use += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"limit": self._limit, "in_use": self._in_use, "waiting": self._waiting}
+
+
+_lock = threading.Lock()
+_max_workers = DEFAULT_MAX_WORKERS
+_limits = {("provider", name): limit for name, limit in DEFAULT_PROVIDER_LIMITS.items()}
+_limiters = {}
+
+
+def get_max_workers():
+    return _max_workers
+
+
+def set_max_workers(value):
+    global _max_workers
+    _max_workers = max(1, int(value))
+
+
+def get_limit(scope, name):
+    """Returns the configured limit for a provider/model, or None if unlimited."""
+    return _limits.get((scope, name))
+
+
+def set_limit(scope, name, limit):
+    """Sets the limit for ("provider" | "model", name). A falsy limit removes it."""
+    with _lock:
+        key = (scope, name)
+        if not limit:
+            _limits.pop(key, None)
+            return
+        _limits[key] = int(limit)
+        if key in _limiters:
+            _limiters[key].set_limit(limit)
+
+
+def _get_limiter(scope, name):
+    key = (scope, name)
+    with _lock:
+        limit = _limits.get(key)
+        if limit is None:
+            return None
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = SlotLimiter(limit)
+        return limiter
+
+
+@contextmanager
+def model_slot(provider, model):
+    """Holds one in-flight request slot for the model and its provider."""
+    held = []
+    try:
+        for scope, name in (("model", model), ("provider", provider)):
+            limiter = _get_limiter(scope, name)
+            if limiter is not None:
+                limiter.acquire()
+                held.append(limiter)
+        yield
+    finally:
+        for limiter in reversed(held):
+            limiter.release()
+
+
+@asynccontextmanager
+async def model_slot_async(provider, model, poll_interval=0.05):
+    """
+    model_slot for coroutines. The slots are the same ones threads use, so
+    async and threaded requests share one limit. A full slot is polled from
+    the event loop rather than waited for on a worker thread, so waiters
+    cannot use up the loop's thread pool that slot holders need.
+    """
+    held = []
+    try:
+        for scope, name in (("model", model), ("provider", provider)):
+            limiter = _get_limiter(scope, name)
+            if limiter is not None:
+                while not limiter.try_acquire():
+                    await asyncio.sleep(poll_interval)
+                held.append(limiter)
+        yield
+    finally:
+        for limiter in reversed(held):
+            limiter.release()
+
+
+def limiter_stats():
+    with _lock:
+        limiters = dict(_limiters)
+    return {f"{scope}:{name}": limiter.stats() for (scope, name), limiter in limiters.items()}
+
+
+def run_folder_jobs(jobs, worker, max_workers=None, initializer=None, succeeded=bool):
+    """
+    Runs worker(subfolder, file_path) for every (subfolder, file_path) job on a
+    bounded thread pool and yields a JobResult as each one finishes, including
+    the wall-clock seconds the worker took.
+
+    A job fails when the worker raises or succeeded(result) is false (by
+    default, when the result is falsy). Once a file in a subfolder fails,
+    files of that subfolder that have not started yet are skipped, since the
+    subfolder will not be moved anyway.
+    """
+    failed_subfolders = set()
+    failed_lock = threading.Lock()
+
+    def run(subfolder, file_path):
+        with failed_lock:
+            if subfolder in failed_subfolders:
+                return JobResult(subfolder, file_path, None, None, True, 0.0)
+        started = time.perf_counter()
+        try:
+            result = worker(subfolder, file_path)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        if error is not None or not succeeded(result):
+            with failed_lock:
+                failed_subfolders.add(subfolder)
+        return JobResult(subfolder, file_path, result, error, False, time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=max_workers or get_max_workers(), initializer=initializer) as executor:
+        futures = [executor.submit(run, subfolder, file_path) for subfolder, file_path in jobs]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,143 @@
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DEFAULT_PROBE_INTERVAL = float(os.getenv("LAWBOT_CONNECTIVITY_INTERVAL", "30"))
+DEFAULT_PROBE_TIMEOUT = float(os.getenv("LAWBOT_CONNECTIVITY_TIMEOUT", "5"))
+GEMINI_API_ENDPOINT = "https://generativelanguage.googleapis.com"
+
+
+def ollama_endpoint():
+    host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.replace("0.0.0.0", "localhost")
+
+
+def gemini_endpoint():
+    """Gemini API base URL; LAWBOT_GEMINI_ENDPOINT points the app at a stand-in server."""
+    return os.getenv("LAWBOT_GEMINI_ENDPOINT", GEMINI_API_ENDPOINT).rstrip("/")
+
+
+DEFAULT_ENDPOINTS = {
+    "internet": "https://www.google.com",
+    "gemini": gemini_endpoint(),
+    "ollama": ollama_endpoint(),
+}
+
+
+def probe_endpoint(url, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Returns (online, error) for an http(s):// or tcp://host:port endpoint.
+    Any HTTP response, including 4xx/5xx, counts as reachable.
+    """
+    parsed = urllib.parse.urlparse(url)
+    try:
+        if parsed.scheme == "tcp":
+            with socket.create_connection((parsed.hostname, parsed.port), timeout=timeout):
+                return True, None
+        with urllib.request.urlopen(url, timeout=timeout):
+            return True, None
+    except urllib.error.HTTPError:
+        return True, None
+    except (urllib.error.URLError, OSError) as e:
+        return False, str(getattr(e, "reason", e))
+
+
+class ConnectivityMonitor:
+    """
+    Probes each named endpoint on a background thread and answers
+    is_online() from the cached result, so callers never block on the network
+    except for the very first check of an endpoint.
+    """
+
+    def __init__(self, endpoints=None, interval=DEFAULT_PROBE_INTERVAL, timeout=DEFAULT_PROBE_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._endpoints = dict(endpoints or DEFAULT_ENDPOINTS)
+        self._state = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="connectivity-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def set_endpoint(self, name, url):
+        with self._lock:
+            if self._endpoints.get(name) == url:
+                return
+            self._endpoints[name] = url
+            self._state.pop(name, None)
+
+    def set_interval(self, interval):
+        self.interval = max(1.0, float(interval))
+        self._wake.set()
+
+    def is_online(self, name):
+        with self._lock:
+            state = self._state.get(name)
+        # Fall back to a direct probe when nothing was recorded yet or the
+        # background thread has fallen far behind
+        if state is None or time.time() - state["checked_at"] > 3 * self.interval:
+            state = self.probe(name)
+        return state["online"]
+
+    def probe(self, name):
+        with self._lock:
+            url = self._endpoints.get(name)
+        if url is None:
+            raise KeyError(f"Unknown connectivity endpoint: {name}")
+        started = time.monotonic()
+        online, error = probe_endpoint(url, self.timeout)
+        state = {
+            "url": url,
+            "online": online,
+            "error": error,
+            "latency_ms": round((time.monotonic() - started) * 1000),
+            "checked_at": time.time(),
+        }
+        with self._lock:
+            # Ignore results for an endpoint that was repointed mid-probe
+            if self._endpoints.get(name) == url:
+                self._state[name] = state
+        return state
+
+    def refresh(self):
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return {name: dict(state) for name, state in self._state.items()}
+
+    def _run(self):
+        while True:
+            with self._lock:
+                names = list(self._endpoints)
+            for name in names:
+                try:
+                    self.probe(name)
+                except Exception:
+                    pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor():
+    """Process-wide monitor, started on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = ConnectivityMonitor().start()
+        return _monitor
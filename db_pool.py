@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    """
+    Wraps a psycopg2 connection checked out of a ConnectionPool.
+    close() hands the connection back to the pool instead of closing it, so
+    existing `conn.close()` call sites keep working unchanged.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Safety net for call sites that return early without closing
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections shared by every session.
+
+    - at most max_size connections are open at once; getconn() waits up to
+      acquire_timeout seconds for one to be returned
+    - connections idle for longer than idle_timeout seconds are closed
+    - connections idle for longer than health_check_after seconds are pinged
+      with SELECT 1 before being handed out
+    """
+
+    def __init__(self, connect, max_size=10, min_size=0, idle_timeout=300,
+                 health_check_after=30, acquire_timeout=10):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.min_size = max(0, min(int(min_size), self.max_size))
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self._idle = deque()  # (connection, returned_at), most recent on the right
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0, "reused": 0, "discarded": 0, "evicted": 0,
+            "health_check_failures": 0, "waits": 0, "timeouts": 0,
+        }
+        self._reaper = threading.Thread(target=self._reap_forever, name="db-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def getconn(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                self._evict_idle_locked()
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use + len(self._idle) < self.max_size:
+                    conn, returned_at = None, None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no database connection available within {self.acquire_timeout}s")
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # Connecting and pinging happen outside the lock
+        counter = "reused"
+        try:
+            if conn is not None and (time.monotonic() - returned_at) > self.health_check_after:
+                if not self._is_healthy(conn):
+                    self._close_quietly(conn)
+                    conn = None
+                    self._count("health_check_failures")
+            if conn is None:
+                conn = self._connect()
+                counter = "created"
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        self._count(counter)
+        return PooledConnection(self, conn)
+
+    def putconn(self, conn):
+        reusable = not conn.closed
+        if reusable:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                reusable = False
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not reusable:
+            self._close_quietly(conn)
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                size=self._in_use + len(self._idle),
+                max_size=self.max_size,
+            )
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _evict_idle_locked(self):
+        now = time.monotonic()
+        # Oldest connections sit on the left; keep at least min_size around
+        while (self._idle and len(self._idle) + self._in_use > self.min_size
+               and now - self._idle[0][1] > self.idle_timeout):
+            conn, _ = self._idle.popleft()
+            self._stats["evicted"] += 1
+            self._close_quietly(conn)
+
+    def _reap_forever(self):
+        interval = max(1, self.idle_timeout / 2)
+        while True:
+            time.sleep(interval)
+            with self._cond:
+                self._evict_idle_locked()
+
+    @staticmethod
+    def _is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,820 @@
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import async_providers
+import chunking
+import concurrency
+import connectivity
+import file_reader
+import metrics
+import packing
+import providers
+import response_cache
+import run_manifest
+from text_extraction import extract_text_from_html
+
+# Document processing shared by the Streamlit app (Chat.py) and the headless
+# batch runner (batch_cli.py). Nothing here imports streamlit: settings is a
+# plain dict shaped like st.session_state["app_config"] plus the user's
+# "api_key", and every message goes through a reporter object with
+# info/success/warning/error (and write_stream/caption/markdown when streaming).
+
+SUPPORTED_EXTENSIONS = (".htm", ".html", ".txt")
+
+# What process_upload does with an upload once it is answered: copy it to the
+# completed folder on a background thread ("background"), before returning
+# ("on"), or not at all ("off").
+ARCHIVE_UPLOADS = os.getenv("LAWBOT_ARCHIVE_UPLOADS", "background")
+
+# "### Task 3", "## ✅ Task 3: question..." - the heading generate_prompt asks for before each answer
+TASK_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]*(?:✅[ \t]*)?\**Task[ \t]+(\d+)\b.*$", re.MULTILINE | re.IGNORECASE)
+
+
+def read_txt_file(file_path):
+    """
+    Reads a text file and returns its content, decoded in whichever encoding
+    file_reader detects (UTF-8, a BOM, or Windows-1252 for older exports).
+    """
+    return file_reader.read_text(file_path)
+
+
+def is_html_document(file_name):
+    """True for .html/.htm, False for .txt; raises ValueError for other types."""
+    file_extension = os.path.splitext(file_name)[1].lower()
+    if file_extension in ['.html', '.htm']:
+        return True
+    if file_extension in ['.txt']:
+        return False
+    raise ValueError(f"Unsupported file type: {file_extension}")
+
+
+def load_document_text(file_path, file_name=None):
+    """
+    Extracted text of an .html/.htm/.txt file; raises ValueError for other
+    types and file_reader.FileTooLarge (a ValueError) for oversized files.
+    """
+    html = is_html_document(file_name or file_path)
+    with metrics.timed("read_file"):
+        file_content = file_reader.read_text(file_path, html=html)
+    if not html:
+        return file_content
+    with metrics.timed("extract_text"):
+        return extract_text_from_html(file_content)
+
+
+def load_document_bytes(data, file_name):
+    """load_document_text for the raw bytes of an upload named file_name."""
+    html = is_html_document(file_name)
+    with metrics.timed("decode_upload"):
+        file_content = file_reader.decode_bytes(data, file_name, html=html)
+    if not html:
+        return file_content
+    with metrics.timed("extract_text"):
+        return extract_text_from_html(file_content)
+
+
+def output_file_name(file_name):
+    """Name of the answer file: HN40169_31.html -> 40169.txt, YBm67453_1002.htm -> m67453.txt."""
+    base_name = os.path.splitext(file_name)[0]
+    # Remove suffix part (everything after the first underscore)
+    name_part = base_name.split('_')[0]
+    # Now remove prefix if it exists
+    if name_part.startswith("YB") or name_part.startswith("HN"):
+        name_part = name_part[2:]
+    return f"{name_part}.txt"
+
+
+def generate_prompt(extracted_text, selected_questions):
+    with metrics.timed("build_prompt"):
+        return _generate_prompt(extracted_text, selected_questions)
+
+
+def _generate_prompt(extracted_text, selected_questions):
+    prompt = f"""
+    ## AI Assistant for Legal Document Analysis
+    Extracted Text:
+    {extracted_text}
+    """
+    if selected_questions:
+        prompt += "\n### Selected Tasks:\n"
+        for idx, question in enumerate(selected_questions, 1):
+            prompt += f"✅ Task {idx}: {question}\n"
+    else:
+        prompt += "\n❌ No tasks selected."
+
+    prompt += "\n\n*Instructions:*\n"
+    prompt += "- Answer each task based on the extracted text.\n"
+    prompt += "- If a task cannot be answered, state 'Information not available.'\n"
+    if selected_questions:
+        prompt += "- Start the answer to each task with a heading line '### Task N' (N is the task number), in task order.\n"
+    return prompt
+
+
+def split_task_answers(body, count):
+    """
+    Splits a reply into the answers of tasks 1..count using the '### Task N'
+    headings. Returns a list of answers, or None unless every task has
+    exactly one heading and a non-empty answer.
+    """
+    headings = list(TASK_HEADING.finditer(body))
+    numbers = [int(match.group(1)) for match in headings]
+    if sorted(numbers) != list(range(1, count + 1)):
+        return None
+    answers = [None] * count
+    for index, match in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(body)
+        answer = body[match.end():end].strip()
+        if not answer:
+            return None
+        answers[numbers[index] - 1] = answer
+    return answers
+
+
+def compose_task_answers(selected_questions, answers):
+    """The response body for per-question answers, in the same '### Task N' layout the model is asked for."""
+    return "\n\n".join(
+        f"### Task {idx}: {question}\n{answer}"
+        for idx, (question, answer) in enumerate(zip(selected_questions, answers), 1)
+    )
+
+
+def split_response_header(response):
+    """Splits "[Response from: source]\n\nbody" into (source, body)."""
+    source = None
+    body = response
+    while body.startswith("[Response from:") and "\n\n" in body:
+        header, body = body.split("\n\n", 1)
+        source = source or header[len("[Response from:"):].rstrip("]").strip()
+    return source, body
+
+
+def is_error_response(response):
+    """True for the "❌ ..." strings the provider functions return instead of raising."""
+    return split_response_header(response)[1].lstrip().startswith("❌")
+
+
+def cache_model_name(settings):
+    if settings["model_provider"] == providers.GEMINI_PROVIDER:
+        return "gemini:" + ",".join(settings.get("gemini_model_sequence", []))
+    return f"ollama:{settings['ollama_model']}"
+
+
+def answered_by_fallback(source, cache_model):
+    """
+    True when a Gemini request (cache_model "gemini:...") was answered by the
+    DeepSeek fallback. Such replies are not cached under the Gemini key, or
+    Gemini would never be asked again for that document once quota returns.
+    """
+    return cache_model.startswith("gemini:") and "DeepSeek" in (source or "")
+
+
+def provider_asker(settings, reporter):
+    """
+    Returns (ask_provider, chunk_budget) for the configured provider, where
+    ask_provider(prompt, stream=False) returns a "[Response from: ...]" string,
+    or (None, None) when Gemini has no API key.
+    """
+    if settings["model_provider"] == providers.GEMINI_PROVIDER:
+        api_key = settings.get("api_key")
+        if not api_key:
+            reporter.error("❌ No API key available. Please contact admin.")
+            return None, None
+        if providers.configure_gemini(api_key):
+            reporter.info("🔑 Configured Gemini API key")
+        ask_provider = lambda prompt, stream=False: providers.get_gemini_response(prompt, settings, reporter, stream=stream)
+        # Any part may end up with the DeepSeek fallback once the Gemini models run out of quota
+        models = settings.get("gemini_model_sequence", []) + [settings.get("ollama_model")]
+        return ask_provider, chunking.chunk_budget(models)
+    ask_provider = lambda prompt, stream=False: providers.get_deepseek_response(
+        prompt, settings["ollama_model"], settings, reporter, stream=stream
+    )
+    return ask_provider, chunking.chunk_budget([settings["ollama_model"]])
+
+
+def generate_response(extracted_text, selected_questions, settings, reporter, stream=False, initializer=None):
+    """
+    Builds the prompt and asks the configured provider, going through the
+    response cache. Answers are also stored per question, so when the same
+    document comes back with extra questions only those are asked and the
+    reply is merged with the stored answers.
+    """
+    cache = response_cache.get_cache()
+    cache_model = cache_model_name(settings)
+    temperature = settings.get("temperature")
+    cache_key = response_cache.make_cache_key(extracted_text, selected_questions, cache_model, temperature)
+    with metrics.timed("cache_lookup", provider=settings["model_provider"]) as labels:
+        cached_response = cache.get(cache_key)
+        labels["outcome"] = "miss" if cached_response is None else "hit"
+    if cached_response is not None:
+        reporter.info("♻️ Using cached response for identical document, questions and model settings")
+        if stream:
+            reporter.markdown(split_response_header(cached_response)[1])
+        return cached_response
+
+    response = None
+    try:
+        ask_provider, budget = provider_asker(settings, reporter)
+        if ask_provider is None:
+            return None
+
+        if selected_questions and chunking.should_chunk(extracted_text, budget):
+            response = generate_chunked_response(
+                extracted_text, selected_questions, ask_provider, budget, reporter, initializer, settings=settings
+            )
+        elif selected_questions:
+            response = generate_incremental_response(
+                extracted_text, selected_questions, ask_provider, cache, cache_model, temperature, reporter, stream
+            )
+        else:
+            response = ask_provider(generate_prompt(extracted_text, selected_questions), stream=stream)
+    except Exception as e:
+        reporter.error(f"❌ Error generating response: {e}")
+        return None
+
+    if response and not is_error_response(response) and not answered_by_fallback(split_response_header(response)[0], cache_model):
+        cache.put(cache_key, response)
+    return response
+
+
+def generate_incremental_response(extracted_text, selected_questions, ask_provider, cache, cache_model, temperature, reporter, stream=False):
+    """
+    Asks only the questions with no stored answer for this document, model and
+    temperature, stores the new answers and returns all of them in task order.
+    A reply that cannot be split per task is returned as is when nothing was
+    stored; otherwise the full question list is asked again.
+    """
+    document_hash = response_cache.text_hash(extracted_text)
+    keys = [response_cache.answer_key(document_hash, question, cache_model, temperature) for question in selected_questions]
+    stored = cache.get_answers(keys)
+    missing = [question for question, key in zip(selected_questions, keys) if key not in stored]
+    reused = len(selected_questions) - len(missing)
+
+    if not missing:
+        reporter.info(f"♻️ Reusing stored answers for all {reused} questions")
+        body = compose_task_answers(selected_questions, [stored[key] for key in keys])
+        if stream:
+            reporter.markdown(body)
+        return f"[Response from: stored answers]\n\n{body}"
+
+    if reused:
+        reporter.info(f"♻️ Reusing {reused} stored answers; asking only {len(missing)} new question(s)")
+    response = ask_provider(generate_prompt(extracted_text, missing), stream=stream)
+    if is_error_response(response):
+        return response
+    source, body = split_response_header(response)
+    new_answers = split_task_answers(body, len(missing))
+    if new_answers is None:
+        if not reused:
+            return response
+        reporter.warning("⚠ Could not match the reply to the new questions; asking all questions again")
+        response = ask_provider(generate_prompt(extracted_text, selected_questions), stream=stream)
+        if is_error_response(response):
+            return response
+        source, body = split_response_header(response)
+        all_answers = split_task_answers(body, len(selected_questions))
+        if all_answers is None:
+            return response
+        missing, new_answers, reused = selected_questions, all_answers, 0
+
+    keys_by_question = dict(zip(selected_questions, keys))
+    fresh = {keys_by_question[question]: answer for question, answer in zip(missing, new_answers)}
+    if not answered_by_fallback(source, cache_model):
+        cache.put_answers(fresh)
+    answers = [fresh.get(key, stored.get(key)) for key in keys]
+    note = f" ({reused} of {len(selected_questions)} answers reused)" if reused else ""
+    return f"[Response from: {source}{note}]\n\n{compose_task_answers(selected_questions, answers)}"
+
+
+def generate_chunked_response(extracted_text, selected_questions, ask_provider, budget, reporter, initializer=None, settings=None):
+    """
+    Map-reduce over parts of an oversized document; returns a normal "[Response from: ...]" string.
+    With settings (and LAWBOT_ASYNC_PROVIDERS on) the parts are answered by the
+    async providers from one event loop instead of one thread per part.
+    """
+    reporter.info(f"✂️ Document is about {chunking.estimate_tokens(extracted_text):,} tokens; answering it in parts of up to {budget:,} tokens")
+    sources = []
+
+    def ask(prompt):
+        response = ask_provider(prompt)
+        source, body = split_response_header(response)
+        if is_error_response(response):
+            raise RuntimeError(body)
+        sources.append(source)
+        return body
+
+    def ask_many(prompts):
+        results = async_providers.generate_many(prompts, settings, chunking.MAX_CHUNK_WORKERS)
+        for result in results:
+            if not result.ok:
+                raise RuntimeError(result.error)
+            sources.append(split_response_header(result.as_response())[0])
+        fallbacks = sum(result.fallback for result in results)
+        reporter.info(
+            f"⚡ {len(results)} prompt(s) answered concurrently in {max(result.seconds for result in results):.1f}s"
+            + (f" ({fallbacks} by DeepSeek after the Gemini models failed)" if fallbacks else "")
+        )
+        return [result.text for result in results]
+
+    answer, parts = chunking.map_reduce(
+        extracted_text, selected_questions, ask, budget,
+        max_workers=chunking.MAX_CHUNK_WORKERS,
+        initializer=initializer,
+        ask_many=ask_many if settings is not None and async_providers.ASYNC_FANOUT else None,
+    )
+    models = ", ".join(dict.fromkeys(source for source in sources if source))
+    return f"[Response from: {models} (chunked, {parts} parts)]\n\n{answer}"
+
+
+def provider_reachable(settings):
+    return connectivity.get_monitor().is_online(providers.provider_endpoint(settings["model_provider"]))
+
+
+_output_locks = {}  # .txt path -> lock held while it is written
+_output_locks_lock = threading.Lock()
+
+
+def write_response(output_subfolder, file_name, response):
+    """Writes the answer file; concurrent writes of the same path are serialized so neither is left half-written."""
+    with metrics.timed("write_output"):
+        os.makedirs(output_subfolder, exist_ok=True)
+        txt_file_path = os.path.join(output_subfolder, output_file_name(file_name))
+        with _output_locks_lock:
+            path_lock = _output_locks.setdefault(os.path.abspath(txt_file_path), threading.Lock())
+        with path_lock:
+            with open(txt_file_path, "w", encoding="utf-8") as txt_file:
+                txt_file.write(response)
+    return txt_file_path
+
+
+def split_output_clashes(jobs, settings):
+    """
+    Splits (subfolder, file_path) jobs into those to run and (job, first_file_path)
+    clashes: later files whose answer would overwrite an earlier file's, as
+    HN40169_31.html and HN40169_32.html both answer to 40169.txt.
+    """
+    owners = {}
+    kept = []
+    clashes = []
+    for subfolder_path, file_path in jobs:
+        output_path = folder_output_path(file_path, os.path.basename(file_path), settings)
+        first_path = owners.setdefault(output_path, file_path)
+        if first_path == file_path:
+            kept.append((subfolder_path, file_path))
+        else:
+            clashes.append(((subfolder_path, file_path), first_path))
+    return kept, clashes
+
+
+def folder_output_path(file_path, file_name, settings):
+    """Where process_html_in_folder writes the answer for a file of a batch subfolder."""
+    subfolder_name = os.path.basename(os.path.dirname(file_path))
+    return os.path.join(settings["output_folder"], subfolder_name, output_file_name(file_name))
+
+
+def process_upload(data, file_name, selected_questions, settings, reporter, stream=False, initializer=None, archive=None):
+    """
+    Answers an uploaded file straight from its bytes and writes the .txt; the
+    upload never goes through the input folder. archive ("background", "on"
+    or "off", default ARCHIVE_UPLOADS) controls the copy kept in the completed folder.
+    """
+    with metrics.timed("process_file", provider=settings["model_provider"]) as labels:
+        response = _process_upload(data, file_name, selected_questions, settings, reporter, stream, initializer, archive or ARCHIVE_UPLOADS)
+        labels["outcome"] = "ok" if response and not is_error_response(response) else "failed"
+        return response
+
+
+def _process_upload(data, file_name, selected_questions, settings, reporter, stream, initializer, archive):
+    if not provider_reachable(settings):
+        reporter.error("❌ Model provider is not reachable. Cannot process file.")
+        return None
+
+    reporter.info(f"ℹ️ Processing upload: {file_name}")
+    try:
+        extracted_text = load_document_bytes(data, file_name)
+    except ValueError as e:
+        reporter.error(f"❌ {e}")
+        return None
+
+    response = generate_response(extracted_text, selected_questions, settings, reporter, stream=stream, initializer=initializer)
+    if not response:
+        return None
+
+    write_response(settings["output_folder"], file_name, response)
+
+    destination_path = os.path.join(settings["completed_folder"], file_name)
+    if archive == "background":
+        archive_upload_in_background(data, destination_path)
+        reporter.success(f"✅ Archiving uploaded file to: {destination_path}")
+    elif archive != "off":
+        try:
+            archive_upload(data, destination_path)
+            reporter.success(f"✅ Archived uploaded file to: {destination_path}")
+        except Exception as e:
+            reporter.error(f"❌ Error archiving uploaded file: {e}")
+    return response
+
+
+def archive_upload(data, destination_path):
+    with metrics.timed("archive_upload"):
+        os.makedirs(os.path.dirname(destination_path) or ".", exist_ok=True)
+        with open(destination_path, "wb") as f:
+            f.write(data)
+
+
+_archive_executor = None
+_archive_lock = threading.Lock()
+
+
+def archive_upload_in_background(data, destination_path):
+    """
+    Queues archive_upload on a single background thread, so uploads are
+    written in order and the answer is shown without waiting for the disk.
+    The session that uploaded may be gone by then, so failures are only
+    recorded as archive_upload errors in metrics; the returned future holds
+    the exception.
+    """
+    global _archive_executor
+    with _archive_lock:
+        if _archive_executor is None:
+            _archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-upload")
+    return _archive_executor.submit(archive_upload, data, destination_path)
+
+
+def process_html_in_folder(file_path, file_name, selected_questions, destination_subfolder, settings, reporter, initializer=None):
+    """Answers one file of a batch subfolder; the output keeps the subfolder name."""
+    if not provider_reachable(settings):
+        reporter.error("❌ Model provider is not reachable. Cannot process HTML.")
+        return None
+
+    reporter.info(f"ℹ️ Processing file: {file_path}")
+    try:
+        extracted_text = load_document_text(file_path, file_name)
+    except ValueError as e:
+        reporter.error(f"❌ {e}")
+        return None
+
+    response = generate_response(extracted_text, selected_questions, settings, reporter, initializer=initializer)
+    # Provider errors come back as "❌ ..." strings; count them as failures so the subfolder is kept
+    if not response or is_error_response(response):
+        return None
+
+    store_folder_response(file_path, file_name, response, destination_subfolder, settings, reporter)
+    return response
+
+
+def store_folder_response(file_path, file_name, response, destination_subfolder, settings, reporter):
+    write_response(os.path.dirname(folder_output_path(file_path, file_name, settings)), file_name, response)
+
+    # Copy processed file to the completed subfolder; the source subfolder is removed once all of it succeeded
+    try:
+        destination_path = os.path.join(destination_subfolder, file_name)
+        with metrics.timed("copy_input"):
+            shutil.copy2(file_path, destination_path)
+        reporter.success(f"✅ Copied processed file to: {destination_path}")
+    except Exception as e:
+        reporter.error(f"❌ Error copying processed file: {e}")
+
+
+def process_pack(file_paths, selected_questions, destination_subfolder, settings, reporter, initializer=None):
+    """
+    Answers several small files of one subfolder with a single packed request
+    and returns {file_path: response or None}. Files the packed reply has no
+    usable answer for, or all of them if the reply cannot be parsed, are
+    answered one by one with process_html_in_folder.
+    """
+    if not provider_reachable(settings):
+        reporter.error("❌ Model provider is not reachable. Cannot process HTML.")
+        return dict.fromkeys(file_paths)
+
+    cache = response_cache.get_cache()
+    cache_model = cache_model_name(settings)
+    responses = {}
+    documents = []
+    for file_path in file_paths:
+        file_name = os.path.basename(file_path)
+        try:
+            extracted_text = load_document_text(file_path, file_name)
+        except ValueError as e:
+            reporter.error(f"❌ {e}")
+            responses[file_path] = None
+            continue
+        cache_key = response_cache.make_cache_key(extracted_text, selected_questions, cache_model, settings.get("temperature"))
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            reporter.info(f"♻️ Using cached response for {file_name}")
+            store_folder_response(file_path, file_name, cached_response, destination_subfolder, settings, reporter)
+            responses[file_path] = cached_response
+            continue
+        documents.append((file_path, extracted_text, cache_key))
+
+    pending = [file_path for file_path, _, _ in documents]
+    if len(documents) > 1 and selected_questions:
+        ask_provider, budget = provider_asker(settings, reporter)
+        prompt = packing.generate_packed_prompt([text for _, text, _ in documents], selected_questions)
+        if ask_provider is not None and chunking.estimate_tokens(prompt) <= budget:
+            names = ", ".join(os.path.basename(file_path) for file_path in pending)
+            reporter.info(f"📦 Answering {len(documents)} small files in one request: {names}")
+            try:
+                response = ask_provider(prompt)
+            except Exception as e:
+                response = f"❌ Error generating response: {e}"
+            source, body = split_response_header(response)
+            answers = {} if is_error_response(response) else packing.parse_packed_response(body, len(documents))
+            pending = []
+            for number, (file_path, _, cache_key) in enumerate(documents, 1):
+                if number not in answers:
+                    pending.append(file_path)
+                    continue
+                file_response = f"[Response from: {source} (packed, {len(documents)} files)]\n\n{answers[number]}"
+                if not answered_by_fallback(source, cache_model):
+                    cache.put(cache_key, file_response)
+                store_folder_response(file_path, os.path.basename(file_path), file_response, destination_subfolder, settings, reporter)
+                responses[file_path] = file_response
+            if pending:
+                reporter.warning(f"⚠ The packed reply had no usable answer for {len(pending)} of {len(documents)} files; asking for them one by one")
+
+    for file_path in pending:
+        responses[file_path] = process_html_in_folder(
+            file_path, os.path.basename(file_path), selected_questions, destination_subfolder,
+            settings, reporter, initializer=initializer
+        )
+    return responses
+
+
+def list_supported_files(subfolder_path):
+    """Every .html/.htm/.txt file under subfolder_path, in a stable order."""
+    supported_files = []
+    for root, _, files in os.walk(subfolder_path):
+        for file in sorted(files):
+            if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                supported_files.append(os.path.join(root, file))
+    return supported_files
+
+
+def collect_folder_jobs(folder_path, completed_folder, reporter, only=None):
+    """
+    Returns (subfolders, jobs) where jobs are (subfolder, file_path) pairs for
+    every supported file. With only (a set of file paths), just those files
+    and the subfolders that hold them are returned.
+    """
+    subfolders = [
+        os.path.join(folder_path, d) for d in sorted(os.listdir(folder_path))
+        if os.path.isdir(os.path.join(folder_path, d))
+    ]
+    if only is not None:
+        subfolders = [
+            subfolder_path for subfolder_path in subfolders
+            if any(file_path.startswith(subfolder_path + os.sep) for file_path in only)
+        ]
+    jobs = []
+    for subfolder_path in subfolders:
+        subfolder_name = os.path.basename(subfolder_path)
+        supported_files = list_supported_files(subfolder_path)
+        if only is not None:
+            supported_files = [file_path for file_path in supported_files if file_path in only]
+
+        if not supported_files:
+            reporter.warning(f"⚠ No supported files (.html/.htm/.txt) found in subfolder: {subfolder_name}")
+            continue
+
+        os.makedirs(os.path.join(completed_folder, subfolder_name), exist_ok=True)
+        jobs.extend((subfolder_path, file_path) for file_path in supported_files)
+    return subfolders, jobs
+
+
+def pack_jobs(jobs):
+    """Regroups (subfolder, file_path) jobs so small files of a subfolder become (subfolder, (file_path, ...)) packs."""
+    by_subfolder = {}
+    for subfolder_path, file_path in jobs:
+        by_subfolder.setdefault(subfolder_path, []).append(file_path)
+    packed_jobs = []
+    for subfolder_path, file_paths in by_subfolder.items():
+        for pack in packing.plan_packs(file_paths):
+            packed_jobs.append((subfolder_path, tuple(pack) if len(pack) > 1 else pack[0]))
+    return packed_jobs
+
+
+def run_folder(folder_path, selected_questions, settings, reporter, on_result=None, max_workers=None, initializer=None, manifest=None, pack=None, only=None):
+    """
+    Processes every supported file in the subfolders of folder_path on a
+    bounded worker pool and removes each subfolder whose files all succeeded.
+
+    With a run_manifest.RunManifest, files already answered by an earlier,
+    interrupted run (same content, same questions and models) are not sent
+    to the provider again. With pack (default packing.PACKING_ENABLED), small
+    files of a subfolder are answered together by process_pack.
+
+    With only (file paths, as the folder watcher passes), just those files
+    are processed, and a subfolder is only removed when all of its files
+    were among them.
+
+    on_result(job, finished, total) is called in the caller's thread as each
+    concurrency.JobResult comes in. Returns a summary dict (all zeros when
+    there are no subfolders, i.e. nothing to do), or None when the provider
+    is not reachable.
+    """
+    if not provider_reachable(settings):
+        reporter.error("❌ Model provider is not reachable. Cannot process folder.")
+        return None
+
+    completed_folder = settings["completed_folder"]
+    os.makedirs(completed_folder, exist_ok=True)
+
+    if only is not None:
+        only = {os.path.abspath(file_path) for file_path in only}
+        folder_path = os.path.abspath(folder_path)
+    subfolders, jobs = collect_folder_jobs(folder_path, completed_folder, reporter, only)
+    if not subfolders:
+        reporter.warning("⚠ No subfolders found in the source folder.")
+        return {
+            "files": 0, "succeeded": 0, "failed": 0, "skipped": 0, "resumed": 0, "subfolders": 0,
+            "moved": [], "failed_subfolders": [], "waiting_subfolders": [], "seconds": 0.0,
+        }
+    # Subfolders with files outside `only` (e.g. still being written) stay where they are
+    waiting_subfolders = set()
+    if only is not None:
+        waiting_subfolders = {
+            subfolder_path for subfolder_path in subfolders
+            if any(file_path not in only for file_path in list_supported_files(subfolder_path))
+        }
+
+    total_files = len(jobs)
+    jobs, clashes = split_output_clashes(jobs, settings)
+    failed_subfolders = set()
+    for (subfolder_path, file_path), first_path in clashes:
+        failed_subfolders.add(subfolder_path)
+        reporter.error(
+            f"❌ {os.path.basename(file_path)} and {os.path.basename(first_path)} in {os.path.basename(subfolder_path)} "
+            f"both answer to {output_file_name(os.path.basename(file_path))}; rename one of them. Folder will not be moved."
+        )
+    max_workers = max_workers or concurrency.get_max_workers()
+    reporter.info(f"📂 Processing {len(jobs)} files from {len(subfolders)} subfolders with up to {max_workers} parallel requests")
+
+    fingerprint = run_manifest.request_fingerprint(selected_questions, settings)
+    resumed = []
+
+    def resume(file_path, destination_subfolder_path):
+        """Earlier answer for file_path from the manifest, or None; also returns its content hash."""
+        content_hash = run_manifest.file_hash(file_path)
+        output_path = manifest.completed_output(file_path, content_hash, fingerprint)
+        if not output_path:
+            return None, content_hash
+        file_name = os.path.basename(file_path)
+        reporter.info(f"⏭️ {file_name} was already answered in an earlier run: {output_path}")
+        destination_path = os.path.join(destination_subfolder_path, file_name)
+        if not os.path.exists(destination_path):
+            shutil.copy2(file_path, destination_path)
+        resumed.append(file_path)
+        return read_txt_file(output_path), content_hash
+
+    def record(file_path, content_hash, response, seconds, error=None):
+        if response:
+            manifest.mark(
+                file_path, content_hash, fingerprint, run_manifest.DONE,
+                output_path=folder_output_path(file_path, os.path.basename(file_path), settings), seconds=seconds
+            )
+        else:
+            manifest.mark(file_path, content_hash, fingerprint, run_manifest.FAILED, error=error or "no response", seconds=seconds)
+
+    def process_file(subfolder_path, file_path):
+        file_name = os.path.basename(file_path)
+        destination_subfolder_path = os.path.join(completed_folder, os.path.basename(subfolder_path))
+        if manifest is None:
+            return process_html_in_folder(
+                file_path, file_name, selected_questions, destination_subfolder_path,
+                settings, reporter, initializer=initializer
+            )
+
+        response, content_hash = resume(file_path, destination_subfolder_path)
+        if response:
+            return response
+        manifest.mark(file_path, content_hash, fingerprint, run_manifest.RUNNING)
+        started = time.perf_counter()
+        try:
+            response = process_html_in_folder(
+                file_path, file_name, selected_questions, destination_subfolder_path,
+                settings, reporter, initializer=initializer
+            )
+        except Exception as e:
+            record(file_path, content_hash, None, time.perf_counter() - started, e)
+            raise
+        record(file_path, content_hash, response, time.perf_counter() - started)
+        return response
+
+    def process_file_pack(subfolder_path, file_paths):
+        destination_subfolder_path = os.path.join(completed_folder, os.path.basename(subfolder_path))
+        responses = {}
+        content_hashes = {}
+        for file_path in file_paths:
+            if manifest is not None:
+                response, content_hashes[file_path] = resume(file_path, destination_subfolder_path)
+                if response:
+                    responses[file_path] = response
+                    continue
+                manifest.mark(file_path, content_hashes[file_path], fingerprint, run_manifest.RUNNING)
+        pending = [file_path for file_path in file_paths if file_path not in responses]
+        started = time.perf_counter()
+        try:
+            answered = process_pack(pending, selected_questions, destination_subfolder_path, settings, reporter, initializer=initializer) if pending else {}
+        except Exception as e:
+            if manifest is not None:
+                for file_path in pending:
+                    record(file_path, content_hashes[file_path], None, time.perf_counter() - started, e)
+            raise
+        if manifest is not None:
+            for file_path in pending:
+                record(file_path, content_hashes[file_path], answered.get(file_path), time.perf_counter() - started)
+        responses.update(answered)
+        return responses
+
+    def process_job(subfolder_path, item):
+        if isinstance(item, tuple):
+            return process_file_pack(subfolder_path, item)
+        return process_file(subfolder_path, item)
+
+    def job_succeeded(result):
+        if isinstance(result, dict):
+            return all(result.values())
+        return bool(result)
+
+    def file_results(job):
+        """Per-file JobResults; a packed job is expanded into one per file."""
+        if not isinstance(job.file_path, tuple):
+            return [job]
+        responses = job.result or {}
+        return [
+            concurrency.JobResult(job.subfolder, file_path, responses.get(file_path), job.error, job.skipped, job.seconds)
+            for file_path in job.file_path
+        ]
+
+    if pack is None:
+        pack = packing.PACKING_ENABLED
+    if pack:
+        jobs = pack_jobs(jobs)
+        packed = sum(1 for _, item in jobs if isinstance(item, tuple))
+        if packed:
+            reporter.info(f"📦 Packing small files into {packed} multi-document requests")
+
+    started = time.perf_counter()
+    summary = {"files": total_files, "succeeded": 0, "failed": len(clashes), "skipped": 0}
+    finished = len(clashes)
+    for job_result in concurrency.run_folder_jobs(jobs, process_job, max_workers, initializer=initializer, succeeded=job_succeeded):
+        for job in file_results(job_result):
+            finished += 1
+            subfolder_name = os.path.basename(job.subfolder)
+            file_name = os.path.basename(job.file_path)
+            if job.skipped:
+                summary["skipped"] += 1
+                reporter.info(f"⏭️ Skipped {file_name} in {subfolder_name} after an earlier failure.")
+            elif job.error is not None:
+                summary["failed"] += 1
+                failed_subfolders.add(job.subfolder)
+                reporter.error(f"❌ Error processing {file_name} in {subfolder_name}: {job.error}. Folder will not be moved.")
+            elif not job.result:
+                summary["failed"] += 1
+                failed_subfolders.add(job.subfolder)
+                reporter.warning(f"⚠️ Processing failed for {file_name} in {subfolder_name}. Folder will not be moved.")
+            else:
+                summary["succeeded"] += 1
+            if not job.skipped:
+                metrics.observe(
+                    "process_file", job.seconds, provider=settings["model_provider"],
+                    outcome="ok" if job.result and job.error is None else "failed"
+                )
+            if on_result is not None:
+                on_result(job, finished, total_files)
+
+    # A subfolder is only removed once every file in it succeeded
+    moved = []
+    for subfolder_path in subfolders:
+        subfolder_name = os.path.basename(subfolder_path)
+        if subfolder_path in failed_subfolders:
+            reporter.error(f"🛑 Errors in '{subfolder_name}'. Skipping folder move.")
+            continue
+        if subfolder_path in waiting_subfolders:
+            reporter.info(f"⏳ '{subfolder_name}' has files that were not processed yet; it is moved once they are.")
+            continue
+        try:
+            if os.path.exists(subfolder_path):
+                with metrics.timed("remove_subfolder"):
+                    shutil.rmtree(subfolder_path)
+                moved.append(subfolder_name)
+                if manifest is not None:
+                    manifest.forget_folder(subfolder_path)
+                reporter.success(f"✅ Processed subfolder '{subfolder_name}' and moved contents to: {os.path.join(completed_folder, subfolder_name)}")
+        except Exception as e:
+            reporter.error(f"❌ Error removing source subfolder '{subfolder_name}' after processing: {e}")
+
+    summary.update(
+        resumed=len(resumed),
+        subfolders=len(subfolders),
+        moved=moved,
+        failed_subfolders=sorted(os.path.basename(path) for path in failed_subfolders),
+        waiting_subfolders=sorted(os.path.basename(path) for path in waiting_subfolders),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return summary
@@ -0,0 +1,123 @@
+import codecs
+import mmap
+import os
+import re
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # pragma: no cover - it ships with requests, but keep reading files without it
+    from_bytes = None
+
+# One reader for every input file, HTML or text: the bytes are read once
+# (memory-mapped when the file is large), the encoding is decided from a
+# sample of them, and they are decoded once. Files over MAX_FILE_BYTES are
+# refused so a single huge upload cannot exhaust a worker's memory.
+MAX_FILE_BYTES = int(float(os.getenv("LAWBOT_MAX_FILE_MB", "50")) * 1024 * 1024)
+MMAP_THRESHOLD = int(float(os.getenv("LAWBOT_MMAP_THRESHOLD_MB", "4")) * 1024 * 1024)
+SAMPLE_BYTES = 64 * 1024
+DETECT_BYTES = 16 * 1024  # charset-normalizer's cost grows with the sample; this much is plenty
+FALLBACK_ENCODING = "cp1252"
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+
+
+class FileTooLarge(ValueError):
+    pass
+
+
+def _is_utf8(sample, complete):
+    """True when sample decodes as UTF-8; a multi-byte sequence cut off at the end of a partial sample is fine."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _decodes_as(sample, encoding):
+    try:
+        sample.decode(encoding)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _known_encoding(name):
+    try:
+        return codecs.lookup(name.decode("ascii", "ignore") if isinstance(name, bytes) else name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(sample, html=False, complete=True):
+    """
+    Encoding of a document from (a sample of) its bytes: a byte order mark,
+    then valid UTF-8, then an HTML <meta charset>, else Windows-1252, which
+    legal exports from Word mostly are. charset-normalizer is only asked
+    when the sample cannot be Windows-1252 (it uses bytes that code page
+    leaves undefined): on short Western text it guesses cp1250, Mac or
+    UTF-16 encodings and garbles "Señor Peña" or "Straße".
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if _is_utf8(sample, complete):
+        return "utf-8"
+    if html:
+        match = META_CHARSET.search(sample[:4096])
+        encoding = match and _known_encoding(match.group(1))
+        # A page saved by a browser can still claim UTF-8 after failing the check above
+        if encoding and encoding != "utf-8":
+            return encoding
+    if from_bytes is not None and not _decodes_as(sample, FALLBACK_ENCODING):
+        best = from_bytes(sample[:DETECT_BYTES]).best()
+        # UTF-16/32 without a byte order mark is never what a legal export is
+        if best is not None and not best.encoding.startswith(("utf_16", "utf_32")):
+            return best.encoding
+    return FALLBACK_ENCODING
+
+
+def _check_size(name, size, max_bytes):
+    max_bytes = MAX_FILE_BYTES if max_bytes is None else max_bytes
+    if max_bytes and size > max_bytes:
+        raise FileTooLarge(
+            f"{name} is {size / (1024 * 1024):.1f} MB; files over "
+            f"{max_bytes / (1024 * 1024):.1f} MB are not processed (LAWBOT_MAX_FILE_MB)"
+        )
+
+
+def _decode(data, html):
+    encoding = detect_encoding(data[:SAMPLE_BYTES], html, complete=len(data) <= SAMPLE_BYTES)
+    return str(data, encoding, "replace")
+
+
+def read_text(file_path, html=False, max_bytes=None):
+    """
+    Reads and decodes file_path in one pass. Raises FileTooLarge (a
+    ValueError) for files over max_bytes (default MAX_FILE_BYTES). Bytes
+    that are invalid in the detected encoding become U+FFFD rather than
+    failing the whole document.
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        _check_size(os.path.basename(file_path), size, max_bytes)
+        if size >= MMAP_THRESHOLD:
+            # Decoding straight from the mapping avoids holding a bytes copy next to the str
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _decode(data, html)
+        data = f.read()
+    return _decode(data, html)
+
+
+def decode_bytes(data, name, html=False, max_bytes=None):
+    """read_text for content that is already in memory, such as an upload; name is only used in errors."""
+    _check_size(name, len(data), max_bytes)
+    return _decode(data, html)
@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from collections import deque
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+import document_pipeline
+import run_manifest
+
+# Watch mode: instead of waiting for "Process Folder", new .htm/.html/.txt
+# files in the subfolders of the input folder are answered as they arrive.
+# A file is only queued once it has had no filesystem events and kept the
+# same size and modification time for DEBOUNCE_SECONDS, so files that are
+# still being copied in are never read half-written.
+DEBOUNCE_SECONDS = float(os.getenv("LAWBOT_WATCH_DEBOUNCE", "3"))
+TICK_SECONDS = float(os.getenv("LAWBOT_WATCH_TICK", "1"))
+LOG_SIZE = 200
+
+
+def file_signature(file_path):
+    """(size, mtime) of a file that can be opened for reading, else None."""
+    try:
+        stat = os.stat(file_path)
+        # Windows keeps a file that is still being copied locked
+        with open(file_path, "rb"):
+            pass
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class MessageLog:
+    """Reporter that keeps the most recent pipeline messages, for a UI to show later."""
+
+    def __init__(self, size=LOG_SIZE):
+        self.messages = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def _log(self, level, message):
+        with self._lock:
+            self.messages.append((time.strftime("%H:%M:%S"), level, str(message)))
+
+    def info(self, message):
+        self._log("info", message)
+
+    def success(self, message):
+        self._log("success", message)
+
+    def warning(self, message):
+        self._log("warning", message)
+
+    def error(self, message):
+        self._log("error", message)
+
+    def caption(self, message):
+        self._log("info", message)
+
+    def markdown(self, message):
+        pass
+
+    def write_stream(self, chunks):
+        return "".join(chunks)
+
+    def recent(self, count=50):
+        with self._lock:
+            return list(self.messages)[-count:]
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path:
+                self.watcher.touch(os.fsdecode(path))
+
+
+class FolderWatcher:
+    """
+    Watches settings["input_folder"] and answers settled files in batches on
+    a background thread through document_pipeline.run_folder(only=...), with
+    a run manifest so files answered earlier are never asked again. Each
+    batch also includes the finished files of the same subfolders, so a
+    subfolder is moved to the completed folder once all of its files are done.
+    """
+
+    def __init__(self, settings, selected_questions, reporter=None, manifest=None, debounce=DEBOUNCE_SECONDS, on_batch=None):
+        self.settings = dict(settings)
+        self.selected_questions = list(selected_questions)
+        self.folder = os.path.abspath(settings["input_folder"])
+        self.reporter = reporter or MessageLog()
+        self.manifest = manifest or run_manifest.get_manifest()
+        self.debounce = debounce
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+        self._pending = {}  # file path -> (last event time, signature)
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+        self.stats = {"started_at": None, "batches": 0, "files": 0, "succeeded": 0, "failed": 0, "last_batch": None}
+
+    def touch(self, path):
+        """Records activity on path: a supported file inside a subfolder, or a directory whose files are then recorded."""
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            if path.startswith(self.folder + os.sep):
+                for file_path in document_pipeline.list_supported_files(path):
+                    self.touch(file_path)
+            return
+        if not path.lower().endswith(document_pipeline.SUPPORTED_EXTENSIONS):
+            return
+        # Only files inside a subfolder are processed, like "Process Folder" does
+        relative = os.path.relpath(path, self.folder)
+        if relative.startswith(os.pardir) or os.sep not in relative:
+            return
+        with self._lock:
+            if os.path.exists(path):
+                self._pending[path] = (time.monotonic(), file_signature(path))
+            else:
+                self._pending.pop(path, None)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def settled_files(self):
+        """Removes and returns the pending files that have been quiet for the debounce time."""
+        now = time.monotonic()
+        settled = []
+        with self._lock:
+            candidates = [(path, entry) for path, entry in self._pending.items() if now - entry[0] >= self.debounce]
+        for path, entry in candidates:
+            signature = entry[1]
+            current = file_signature(path)
+            with self._lock:
+                if self._pending.get(path) != entry:
+                    continue  # touched again meanwhile
+                if not os.path.exists(path):
+                    del self._pending[path]
+                elif current is None or current != signature:
+                    self._pending[path] = (now, current)
+                else:
+                    del self._pending[path]
+                    settled.append(path)
+        return settled
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        # Files that were already there when watching started are queued too
+        for entry in sorted(os.listdir(self.folder)):
+            self.touch(os.path.join(self.folder, entry))
+        self._observer = Observer()
+        self._observer.schedule(_EventHandler(self), self.folder, recursive=True)
+        self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+        self.stats["started_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.reporter.info(f"👀 Watching {self.folder} for new files")
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.reporter.info(f"⏹️ Stopped watching {self.folder}")
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def process_once(self):
+        """Processes the files that have settled; returns run_folder's summary, or None if there were none."""
+        settled = self.settled_files()
+        if not settled:
+            return None
+        with self._lock:
+            unsettled = set(self._pending)
+        subfolders = {os.path.join(self.folder, os.path.relpath(path, self.folder).split(os.sep)[0]) for path in settled}
+        batch = set(settled)
+        for subfolder_path in subfolders:
+            batch.update(path for path in document_pipeline.list_supported_files(subfolder_path) if path not in unsettled)
+        self.reporter.info(f"📥 {len(settled)} new file(s) ready in {', '.join(sorted(os.path.basename(path) for path in subfolders))}")
+        summary = document_pipeline.run_folder(
+            self.folder, self.selected_questions, self.settings, self.reporter, manifest=self.manifest, only=batch
+        )
+        if summary is None:
+            # Provider unreachable: put the files back and try again on a later tick
+            with self._lock:
+                for path in settled:
+                    self._pending.setdefault(path, (time.monotonic(), file_signature(path)))
+            return None
+        self.stats["batches"] += 1
+        self.stats["files"] += summary["files"]
+        self.stats["succeeded"] += summary["succeeded"]
+        self.stats["failed"] += summary["failed"]
+        self.stats["last_batch"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if self.on_batch is not None:
+            self.on_batch(summary)
+        return summary
+
+    def _run(self):
+        while not self._stop.wait(TICK_SECONDS):
+            try:
+                self.process_once()
+            except Exception as e:
+                self.reporter.error(f"❌ Watch mode batch failed: {e}")
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def start_watcher(settings, selected_questions, reporter=None, manifest=None, on_batch=None):
+    """Starts (or returns the running) process-wide watcher for settings["input_folder"]."""
+    folder = os.path.abspath(settings["input_folder"])
+    with _watchers_lock:
+        watcher = _watchers.get(folder)
+        if watcher is None or not watcher.running:
+            watcher = _watchers[folder] = FolderWatcher(settings, selected_questions, reporter, manifest, on_batch=on_batch)
+            watcher.start()
+        return watcher
+
+
+def get_watcher(folder):
+    with _watchers_lock:
+        watcher = _watchers.get(os.path.abspath(folder))
+    return watcher if watcher is not None and watcher.running else None
+
+
+def stop_watcher(folder):
+    with _watchers_lock:
+        watcher = _watchers.pop(os.path.abspath(folder), None)
+    if watcher is not None:
+        watcher.stop()
+    return watcher is not None
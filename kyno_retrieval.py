@@ -0,0 +1,175 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+SCRAPED_DATA_FILE = "kyno_scraped_data.txt"
+INDEX_FILE = os.getenv("KYNO_INDEX_FILE", "kyno_index.json")
+INDEX_VERSION = 1
+DEFAULT_TOP_K = int(os.getenv("KYNO_TOP_K", "5"))
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("KYNO_CONTEXT_TOKENS", "1500"))
+PASSAGE_WORDS = 120
+CHARS_PER_TOKEN = 4
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+PAGE_MARKER = re.compile(r"^--- Page: (?P<url>\S+) ---$", re.MULTILINE)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our "
+    "the their this to us we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_passages(scraped_text, passage_words=PASSAGE_WORDS):
+    """Splits the scraped site into passages, never crossing a "--- Page: url ---" marker."""
+    passages = []
+    markers = list(PAGE_MARKER.finditer(scraped_text))
+    sections = [
+        (marker.group("url"), scraped_text[marker.end():markers[i + 1].start() if i + 1 < len(markers) else len(scraped_text)])
+        for i, marker in enumerate(markers)
+    ] or [(None, scraped_text)]
+
+    for url, section in sections:
+        lines, words = [], 0
+        for line in section.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            lines.append(line)
+            words += len(line.split())
+            if words >= passage_words:
+                passages.append({"url": url, "text": "\n".join(lines)})
+                lines, words = [], 0
+        if lines:
+            passages.append({"url": url, "text": "\n".join(lines)})
+    return passages
+
+
+class KynoIndex:
+    """
+    BM25 index over the scraped KynoHealth site. Built once, persisted to
+    index_path and rebuilt only when the scraped file's contents change.
+    """
+
+    def __init__(self, source_path=SCRAPED_DATA_FILE, index_path=INDEX_FILE):
+        self.source_path = source_path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._source_stat = None
+        self._source_hash = None
+        self.passages = []
+        self._term_freqs = []
+        self._lengths = []
+        self._doc_freqs = {}
+        self._avg_length = 0.0
+
+    def search(self, question, top_k=DEFAULT_TOP_K):
+        """Returns up to top_k (score, passage) pairs, best first."""
+        self.refresh()
+        query = set(tokenize(question))
+        if not query or not self.passages:
+            return []
+        total = len(self.passages)
+        scores = []
+        for i, term_freqs in enumerate(self._term_freqs):
+            score = 0.0
+            for term in query:
+                freq = term_freqs.get(term)
+                if not freq:
+                    continue
+                doc_freq = self._doc_freqs[term]
+                idf = math.log(1 + (total - doc_freq + 0.5) / (doc_freq + 0.5))
+                norm = K1 * (1 - B + B * self._lengths[i] / self._avg_length)
+                score += idf * freq * (K1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((score, i))
+        scores.sort(reverse=True)
+        return [(score, self.passages[i]) for score, i in scores[:top_k]]
+
+    def build_context(self, question, top_k=DEFAULT_TOP_K, max_tokens=DEFAULT_CONTEXT_TOKENS):
+        """Top-k passages for the question as prompt context, cut to max_tokens."""
+        budget = max_tokens * CHARS_PER_TOKEN
+        blocks = []
+        for _, passage in self.search(question, top_k):
+            block = f"[Source: {passage['url']}]\n{passage['text']}" if passage["url"] else passage["text"]
+            if len(block) > budget:
+                if not blocks:
+                    blocks.append(block[:budget])
+                break
+            blocks.append(block)
+            budget -= len(block) + 2
+        return "\n\n".join(blocks)
+
+    def refresh(self):
+        """Loads or rebuilds the index if the scraped file changed since the last check."""
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        if stat_key == self._source_stat:
+            return
+        with self._lock:
+            if stat_key == self._source_stat:
+                return
+            with open(self.source_path, "rb") as f:
+                raw = f.read()
+            source_hash = hashlib.sha256(raw).hexdigest()
+            if source_hash != self._source_hash and not self._load(source_hash):
+                self._build(raw.decode("utf-8", errors="replace"), source_hash)
+                self._save()
+            self._source_stat = stat_key
+
+    def _build(self, scraped_text, source_hash):
+        self.passages = split_passages(scraped_text)
+        self._term_freqs = [Counter(tokenize(passage["text"])) for passage in self.passages]
+        self._set_statistics(source_hash)
+
+    def _set_statistics(self, source_hash):
+        self._source_hash = source_hash
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        self._avg_length = self._avg_length or 1.0
+        doc_freqs = Counter()
+        for freqs in self._term_freqs:
+            doc_freqs.update(freqs.keys())
+        self._doc_freqs = dict(doc_freqs)
+
+    def _load(self, source_hash):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("source_sha256") != source_hash:
+            return False
+        self.passages = data["passages"]
+        self._term_freqs = [Counter(freqs) for freqs in data["term_freqs"]]
+        self._set_statistics(source_hash)
+        return True
+
+    def _save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "source_sha256": self._source_hash,
+            "passages": self.passages,
+            "term_freqs": [dict(freqs) for freqs in self._term_freqs],
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # A read-only deployment still works, it just rebuilds on restart
+            pass
@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency histograms and counters for each stage of document processing
+# (reading, extraction, prompt building, rate-limit waits, LLM calls, output
+# and file moves), labelled by stage, provider, model and outcome. They are
+# rendered in the Prometheus text format by render(), served over HTTP when
+# LAWBOT_METRICS_PORT is set and written to LAWBOT_METRICS_FILE when set.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRICS_PORT = int(os.getenv("LAWBOT_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("LAWBOT_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.getenv("LAWBOT_METRICS_FILE_INTERVAL", "15"))
+LABELS = ("stage", "provider", "model", "outcome")
+PREFIX = "lawbot_stage"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantile(self, q):
+        """Upper bucket bound that holds the q-quantile; max for the overflow bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # (stage, provider, model, outcome) -> Histogram
+
+    def observe(self, stage, seconds, provider="", model="", outcome="ok"):
+        key = (stage, provider or "", model or "", outcome or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage, provider="", model="", outcome="ok"):
+        """
+        Times the block as one observation of stage. The yielded dict can be
+        updated to change the labels (e.g. outcome="quota") before the block
+        ends; an exception sets outcome="error" unless it was already changed.
+        """
+        labels = {"provider": provider, "model": model, "outcome": outcome}
+        started = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if labels["outcome"] == outcome:
+                labels["outcome"] = "error"
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self):
+        """One row per label combination, for the admin panel."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [
+                dict(
+                    zip(LABELS, key),
+                    count=histogram.count,
+                    total_seconds=round(histogram.sum, 3),
+                    mean_seconds=round(histogram.sum / histogram.count, 4) if histogram.count else 0.0,
+                    p95_seconds=histogram.quantile(0.95),
+                    max_seconds=round(histogram.max, 3),
+                )
+                for key, histogram in items
+            ]
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {PREFIX}_seconds Time spent in each document pipeline stage.",
+            f"# TYPE {PREFIX}_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for key, histogram in items:
+                labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(LABELS, key))
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{PREFIX}_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}_seconds_count{{{labels}}} {histogram.count}")
+            lines.append(f"# HELP {PREFIX}_total Number of times each document pipeline stage ran.")
+            lines.append(f"# TYPE {PREFIX}_total counter")
+            for key, histogram in items:
+                labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(LABELS, key))
+                lines.append(f"{PREFIX}_total{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        # Write then rename so a scraper (e.g. node_exporter's textfile collector) never reads half a file
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temporary_path, path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+timed = registry.timed
+observe = registry.observe
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+endpoint_error = None  # why the /metrics endpoint could not be started, for the admin panel
+
+
+def start_exporters(port=None, path=None):
+    """
+    Starts the /metrics HTTP endpoint and/or the periodic metrics file writer
+    once per process. Returns the port actually served, or None; when the
+    port cannot be bound the reason is kept in endpoint_error.
+    """
+    global _exporters_started, endpoint_error
+    port = METRICS_PORT if port is None else port
+    path = METRICS_FILE if path is None else path
+    with _exporters_lock:
+        if _exporters_started:
+            return None
+        _exporters_started = True
+    served_port = None
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            endpoint_error = f"Metrics endpoint not started on port {port}: {e}"
+        else:
+            served_port = server.server_address[1]
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if path:
+        threading.Thread(target=_write_file_forever, args=(path,), name="metrics-file", daemon=True).start()
+    return served_port
+
+
+def _write_file_forever(path):
+    while True:
+        try:
+            registry.write_file(path)
+        except OSError:
+            pass
+        time.sleep(METRICS_FILE_INTERVAL)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
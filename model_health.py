@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+import time
+
+try:
+    from google.api_core.exceptions import TooManyRequests
+except ImportError:  # pragma: no cover - installed with google-generativeai
+    TooManyRequests = None
+
+DEFAULT_COOLDOWN = float(os.getenv("LAWBOT_QUOTA_COOLDOWN", "60"))
+MAX_COOLDOWN = float(os.getenv("LAWBOT_QUOTA_MAX_COOLDOWN", "3600"))
+
+# Retry hints seen in Gemini quota errors, e.g. "retry_delay { seconds: 37 }",
+# "Please retry in 12.5s" or "Retry-After: 30"
+RETRY_HINT_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry[- ]after:?\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|s|sec|seconds?|m|min|minutes?)?", re.IGNORECASE),
+    re.compile(r"retry in\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|s|sec|seconds?|m|min|minutes?)?", re.IGNORECASE),
+]
+
+
+# An HTTP 429 status in an error message: "429 Resource has been exhausted",
+# "HTTP 429", "status code: 429"; not any 429 inside a request id or byte count
+HTTP_429_PATTERN = re.compile(r"^\s*429\b|\b(?:http|status|code|error)\b\W{0,3}(?:code\W{0,3})?429\b", re.IGNORECASE)
+
+
+def is_quota_error(error):
+    # ResourceExhausted (gRPC) is a subclass of TooManyRequests (REST)
+    if TooManyRequests is not None and isinstance(error, TooManyRequests):
+        return True
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    error_msg = str(error).lower()
+    return (
+        "quota" in error_msg or "rate limit" in error_msg or "resource exhausted" in error_msg
+        or HTTP_429_PATTERN.search(error_msg) is not None
+    )
+
+
+def parse_retry_after(error):
+    """Seconds to wait according to the error text, or None if it has no hint."""
+    message = str(error)
+    for pattern in RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            value = float(match.group("value"))
+            unit = (match.groupdict().get("unit") or "s").lower()
+            if unit == "ms":
+                value /= 1000
+            elif unit.startswith("m"):
+                value *= 60
+            return value
+    return None
+
+
+class ModelHealthRegistry:
+    """
+    Per-model circuit breaker shared by every session.
+
+    closed     requests go through
+    open       the model hit a quota/rate limit; requests skip it until the
+               cooldown (the error's retry hint, else exponential backoff) ends
+    half_open  cooldown over; one trial request is let through, and its
+               outcome closes or re-opens the circuit
+    """
+
+    def __init__(self, default_cooldown=DEFAULT_COOLDOWN, max_cooldown=MAX_COOLDOWN):
+        self.default_cooldown = default_cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _state(self, model):
+        return self._models.setdefault(model, {
+            "state": "closed",
+            "open_until": 0.0,
+            "consecutive_quota_errors": 0,
+            "quota_errors": 0,
+            "successes": 0,
+            "last_error": None,
+            "trial_in_flight": False,
+        })
+
+    def acquire(self, model):
+        """True if a request may be sent to the model now."""
+        with self._lock:
+            state = self._state(model)
+            if state["state"] == "closed":
+                return True
+            if state["state"] == "open" and time.time() >= state["open_until"]:
+                state["state"] = "half_open"
+            if state["state"] == "half_open" and not state["trial_in_flight"]:
+                state["trial_in_flight"] = True
+                return True
+            return False
+
+    def record_success(self, model):
+        with self._lock:
+            state = self._state(model)
+            state.update(state="closed", open_until=0.0, consecutive_quota_errors=0, trial_in_flight=False)
+            state["successes"] += 1
+
+    def record_quota_error(self, model, error):
+        """Opens the circuit and returns the cooldown in seconds."""
+        with self._lock:
+            state = self._state(model)
+            state["consecutive_quota_errors"] += 1
+            state["quota_errors"] += 1
+            cooldown = parse_retry_after(error)
+            if cooldown is None:
+                cooldown = self.default_cooldown * 2 ** (state["consecutive_quota_errors"] - 1)
+            cooldown = min(cooldown, self.max_cooldown)
+            state.update(
+                state="open",
+                open_until=time.time() + cooldown,
+                last_error=str(error)[:300],
+                trial_in_flight=False,
+            )
+            return cooldown
+
+    def release(self, model):
+        """Ends a request that failed for a reason other than quota."""
+        with self._lock:
+            self._state(model)["trial_in_flight"] = False
+
+    def remaining_cooldown(self, model):
+        with self._lock:
+            state = self._models.get(model)
+            if not state or state["state"] == "closed":
+                return 0.0
+            return max(0.0, state["open_until"] - time.time())
+
+    def reset(self, model=None):
+        with self._lock:
+            if model is None:
+                self._models.clear()
+            else:
+                self._models.pop(model, None)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            return {
+                model: dict(state, cooldown_remaining=max(0.0, state["open_until"] - now) if state["state"] != "closed" else 0.0)
+                for model, state in self._models.items()
+            }
+
+
+registry = ModelHealthRegistry()
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+
+import ollama
+
+import chunking
+import connectivity
+import metrics
+
+# Ollama unloads a model after five idle minutes and uses a small default
+# context window, so a cold call pays for loading the model and a long
+# judgment is silently truncated. Requests made through OllamaSession keep
+# the model resident for KEEP_ALIVE, size num_ctx from the prompt and share
+# one HTTP client; preload() loads a model before the first document arrives.
+KEEP_ALIVE = os.getenv("LAWBOT_OLLAMA_KEEP_ALIVE", "30m")
+PRELOAD = os.getenv("LAWBOT_OLLAMA_PRELOAD", "on") == "on"
+MIN_CONTEXT = int(os.getenv("LAWBOT_OLLAMA_MIN_CONTEXT", "4096"))
+MAX_CONTEXT = int(os.getenv("LAWBOT_OLLAMA_MAX_CONTEXT", "32768"))
+REPLY_TOKENS = int(os.getenv("LAWBOT_OLLAMA_REPLY_TOKENS", "2048"))
+PROVIDER = "DeepSeek (Ollama)"
+
+
+def parse_keep_alive(value):
+    """
+    Ollama reads a string keep_alive as a Go duration ("30m", "-1m") and
+    rejects one without a unit, so a bare number such as "-1" or "600" is sent
+    as a number, which Ollama takes as seconds (-1 keeps the model loaded).
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        for number in (int, float):
+            try:
+                return number(text)
+            except ValueError:
+                pass
+        return text
+    return value
+
+
+def response_field(response, name):
+    """Reads a field of an ollama response, which is a dict or a model object depending on the client version."""
+    if isinstance(response, dict):
+        return response.get(name)
+    return getattr(response, name, None)
+
+
+class OllamaSession:
+    """
+    One ollama.Client for the process plus per-model warm-up state.
+
+    The context window only grows per model (in powers of two): Ollama
+    reloads a model whenever num_ctx changes, so flip-flopping between sizes
+    would cost a load on every other request.
+    """
+
+    def __init__(self, host=None, keep_alive=KEEP_ALIVE, min_context=MIN_CONTEXT, max_context=MAX_CONTEXT):
+        self.host = host or connectivity.ollama_endpoint()
+        self._keep_alive = parse_keep_alive(keep_alive)
+        self.min_context = min_context
+        self.max_context = max_context
+        self.client = ollama.Client(host=self.host)
+        self._lock = threading.Lock()
+        self._context = {}  # model -> num_ctx currently loaded
+        self._models = {}  # model -> timings for the admin panel
+        self._preloading = set()
+
+    @property
+    def keep_alive(self):
+        return self._keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, value):
+        self._keep_alive = parse_keep_alive(value)
+
+    def context_size(self, model, prompt):
+        """num_ctx that fits the prompt plus REPLY_TOKENS, never smaller than what the model already has."""
+        needed = max(self.min_context, chunking.estimate_tokens(prompt) + REPLY_TOKENS)
+        size = 1 << (needed - 1).bit_length()
+        with self._lock:
+            size = min(max(size, self._context.get(model, 0)), self.max_context)
+            self._context[model] = size
+        return size
+
+    def options(self, model, prompt, temperature):
+        return {"temperature": temperature, "num_ctx": self.context_size(model, prompt)}
+
+    def chat(self, model, prompt, temperature, stream=False):
+        return self.client.chat(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            options=self.options(model, prompt, temperature),
+            keep_alive=self.keep_alive,
+            stream=stream,
+        )
+
+    def record_timings(self, model, response):
+        """
+        Records the load and generation times Ollama reports in a final
+        response (or last stream chunk); returns (load_seconds, generation_seconds).
+        """
+        load_seconds = (response_field(response, "load_duration") or 0) / 1e9
+        generation_seconds = ((response_field(response, "prompt_eval_duration") or 0) + (response_field(response, "eval_duration") or 0)) / 1e9
+        if load_seconds >= 0.001:
+            metrics.observe("model_load", load_seconds, provider=PROVIDER, model=model)
+        if generation_seconds:
+            metrics.observe("generation", generation_seconds, provider=PROVIDER, model=model)
+        with self._lock:
+            entry = self._models.setdefault(model, {"model": model, "requests": 0, "loads": 0, "load_seconds": 0.0})
+            entry["requests"] += 1
+            if load_seconds >= 0.001:
+                entry["loads"] += 1
+                entry["load_seconds"] = round(entry["load_seconds"] + load_seconds, 2)
+            entry["last_generation_seconds"] = round(generation_seconds, 2)
+        return load_seconds, generation_seconds
+
+    def preload(self, model):
+        """
+        Loads model (with the context it will use) and keeps it resident.
+        Returns the seconds it took, or None when Ollama could not be reached.
+        """
+        with self._lock:
+            num_ctx = self._context.setdefault(model, self.min_context)
+        started = time.perf_counter()
+        try:
+            response = self.client.generate(model=model, prompt="", keep_alive=self.keep_alive, options={"num_ctx": num_ctx})
+        except Exception as e:
+            metrics.observe("model_load", time.perf_counter() - started, provider=PROVIDER, model=model, outcome="error")
+            with self._lock:
+                self._models.setdefault(model, {"model": model, "requests": 0, "loads": 0, "load_seconds": 0.0})["preload_error"] = str(e)
+            return None
+        seconds = time.perf_counter() - started
+        load_seconds = (response_field(response, "load_duration") or 0) / 1e9
+        metrics.observe("model_load", load_seconds or seconds, provider=PROVIDER, model=model, outcome="preload")
+        with self._lock:
+            entry = self._models.setdefault(model, {"model": model, "requests": 0, "loads": 0, "load_seconds": 0.0})
+            entry["preloaded_at"] = time.strftime("%H:%M:%S")
+            entry["preload_seconds"] = round(seconds, 2)
+            entry.pop("preload_error", None)
+        return seconds
+
+    def preload_in_background(self, model):
+        """Starts preload(model) on a daemon thread, once per model, if Ollama is online."""
+        with self._lock:
+            if model in self._preloading:
+                return False
+            self._preloading.add(model)
+
+        def run():
+            if connectivity.get_monitor().is_online("ollama"):
+                self.preload(model)
+
+        threading.Thread(target=run, name=f"ollama-preload-{model}", daemon=True).start()
+        return True
+
+    def stats(self):
+        with self._lock:
+            return [dict(entry, num_ctx=self._context.get(model)) for model, entry in sorted(self._models.items())]
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session for OLLAMA_HOST, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = OllamaSession()
+        return _session
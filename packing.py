@@ -0,0 +1,80 @@
+import os
+import re
+
+# Small documents of the same subfolder are sent together in one prompt
+# ("packed") so that a request-per-minute slot is not spent on a few hundred
+# tokens. The reply holds one delimited answer per document and is split back
+# into the normal per-file answers.
+PACKING_ENABLED = os.getenv("LAWBOT_PACKING", "off") == "on"
+PACK_SMALL_FILE_BYTES = int(os.getenv("LAWBOT_PACK_SMALL_FILE_KB", "16")) * 1024
+PACK_MAX_BYTES = int(os.getenv("LAWBOT_PACK_MAX_KB", "96")) * 1024
+PACK_MAX_DOCS = int(os.getenv("LAWBOT_PACK_MAX_DOCS", "8"))
+
+ANSWER_PATTERN = re.compile(
+    r"^[ \t]*=====[ \t]*BEGIN ANSWER[ \t]+(\d+)[ \t]*=====[ \t]*$(.*?)^[ \t]*=====[ \t]*END ANSWER[ \t]+\1[ \t]*=====[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def is_small(file_path):
+    return os.path.getsize(file_path) <= PACK_SMALL_FILE_BYTES
+
+
+def plan_packs(file_paths, max_docs=None, max_bytes=None):
+    """
+    Groups file paths into packs of at most max_docs files and max_bytes in
+    total, in order. Files that are too big to pack, and packs that end up
+    with a single file, are returned as one-element lists.
+    """
+    max_docs = max_docs or PACK_MAX_DOCS
+    max_bytes = max_bytes or PACK_MAX_BYTES
+    packs = []
+    current = []
+    size = 0
+    for file_path in file_paths:
+        file_size = os.path.getsize(file_path)
+        if file_size > PACK_SMALL_FILE_BYTES:
+            packs.append([file_path])
+            continue
+        if current and (len(current) >= max_docs or size + file_size > max_bytes):
+            packs.append(current)
+            current = []
+            size = 0
+        current.append(file_path)
+        size += file_size
+    if current:
+        packs.append(current)
+    return packs
+
+
+def generate_packed_prompt(documents, selected_questions):
+    """documents is a list of extracted texts; they are numbered from 1 in the prompt."""
+    prompt = f"""
+    ## AI Assistant for Legal Document Analysis
+    Below are {len(documents)} separate documents. Analyse each one on its own.
+    """
+    for number, text in enumerate(documents, 1):
+        prompt += f"\n===== BEGIN DOCUMENT {number} =====\n{text}\n===== END DOCUMENT {number} =====\n"
+    prompt += "\n### Selected Tasks (answer them for every document):\n"
+    for idx, question in enumerate(selected_questions, 1):
+        prompt += f"✅ Task {idx}: {question}\n"
+    prompt += "\n\n*Instructions:*\n"
+    prompt += "- Answer each task for each document, based only on that document's text.\n"
+    prompt += "- If a task cannot be answered for a document, state 'Information not available.'\n"
+    prompt += "- Put the answers for document N between a line '===== BEGIN ANSWER N =====' and a line '===== END ANSWER N =====', for every document in order.\n"
+    prompt += "- Do not write anything outside these blocks.\n"
+    return prompt
+
+
+def parse_packed_response(body, count):
+    """
+    Splits a packed reply into {document number: answer}. Documents whose
+    block is missing or empty are left out; the caller answers them one by one.
+    """
+    answers = {}
+    for match in ANSWER_PATTERN.finditer(body):
+        number = int(match.group(1))
+        answer = match.group(2).strip()
+        if 1 <= number <= count and answer and number not in answers:
+            answers[number] = answer
+    return answers
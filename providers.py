@@ -0,0 +1,195 @@
+import threading
+import time
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+import chunking
+import concurrency
+import connectivity
+import metrics
+import model_health
+import ollama_session
+import rate_limiter
+import streaming
+
+GEMINI_PROVIDER = "Google Gemini"
+OLLAMA_PROVIDER = "DeepSeek (Ollama)"
+
+# The reporter passed to these functions only needs info/success/warning/error,
+# plus write_stream/caption when streaming. The Streamlit app passes the `st`
+# module itself; the batch CLI passes a JSON-lines reporter.
+
+# genai.configure() sets one API key for the whole process, so with several
+# sessions and worker threads a request could go out under another user's
+# key. Each key gets its own client manager instead, and models are bound to
+# the client of the key they are used with.
+_gemini_clients = {}  # api_key -> genai client manager
+_configure_lock = threading.Lock()
+
+
+def provider_endpoint(model_provider):
+    """Connectivity monitor endpoint that serves the given provider."""
+    return "gemini" if model_provider == GEMINI_PROVIDER else "ollama"
+
+
+def configure_gemini(api_key):
+    """Creates the Gemini clients for api_key; returns True the first time a key is seen."""
+    with _configure_lock:
+        if api_key in _gemini_clients:
+            return False
+        manager = genai_client._ClientManager()
+        endpoint = connectivity.gemini_endpoint()
+        if endpoint == connectivity.GEMINI_API_ENDPOINT:
+            manager.configure(api_key=api_key)
+        else:
+            # Stand-in servers (see benchmarks/fake_providers.py) speak the REST API, often over plain http
+            manager.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+        _gemini_clients[api_key] = manager
+        return True
+
+
+def gemini_client(api_key, name="generative"):
+    """The api_key's client for one Gemini service ("generative", "model", ...)."""
+    configure_gemini(api_key)
+    with _configure_lock:
+        return _gemini_clients[api_key].get_default_client(name)
+
+
+def gemini_model(model, api_key):
+    """genai.GenerativeModel that sends its requests with api_key, whatever key other sessions use."""
+    model_instance = genai.GenerativeModel(model)
+    model_instance._client = gemini_client(api_key)
+    return model_instance
+
+
+def get_gemini_response(prompt, settings, reporter, stream=False):
+    """
+    Tries each model of settings["gemini_model_sequence"] in order and falls
+    back to DeepSeek when all of them are out of quota. With stream=True the
+    answer is written through reporter.write_stream as it arrives.
+
+    The whole walk down the sequence, including cooldown skips, rate-limit
+    and slot waits, is recorded as the "fallback_chain" stage.
+    """
+    with metrics.timed("fallback_chain", provider=GEMINI_PROVIDER) as labels:
+        response = _get_gemini_response(prompt, settings, reporter, stream)
+        if response.lstrip().startswith("❌"):
+            labels["outcome"] = "error"
+        elif response.startswith("[Response from: DeepSeek"):
+            labels["outcome"] = "fallback"
+        return response
+
+
+def _get_gemini_response(prompt, settings, reporter, stream):
+    if not connectivity.get_monitor().is_online("gemini"):
+        reporter.error("❌ No internet connection. Cannot get Gemini response.")
+        return "❌ No internet connection."
+
+    temperature = settings.get("temperature")
+    model_sequence = settings.get("gemini_model_sequence", [])
+
+    # Models whose circuit is open after a quota error are skipped until their cooldown ends
+    health = model_health.registry
+    limiter = rate_limiter.get_limiter()
+    api_key = settings.get("api_key")
+    estimated_tokens = chunking.estimate_tokens(prompt)
+    for model in model_sequence:
+        if not health.acquire(model):
+            metrics.observe("llm_call", 0.0, provider=GEMINI_PROVIDER, model=model, outcome="cooldown_skip")
+            reporter.info(f"⏭️ Skipping **{model}**: quota cooldown, {health.remaining_cooldown(model):.0f}s left")
+            continue
+        # Wait for requests/tokens-per-minute capacity shared by everyone using this API key
+        try:
+            with metrics.timed("rate_limit_wait", provider=GEMINI_PROVIDER, model=model) as labels:
+                try:
+                    waited = limiter.acquire(api_key, model, estimated_tokens)
+                except rate_limiter.RateLimitTimeout:
+                    labels["outcome"] = "timeout"
+                    raise
+        except rate_limiter.RateLimitTimeout as e:
+            health.release(model)
+            reporter.warning(f"⚠ {model} is at its rate limit ({e}), trying next model...")
+            continue
+        if waited >= 1:
+            reporter.info(f"⏱️ Waited {waited:.1f}s for **{model}** rate-limit capacity")
+        reporter.info(f"⏳ Attempting to get response from **{model}**...") # Inform the user
+        try:
+            model_instance = gemini_model(model, api_key)
+            with concurrency.model_slot(GEMINI_PROVIDER, model):
+                with metrics.timed("llm_call", provider=GEMINI_PROVIDER, model=model) as labels:
+                    try:
+                        # generate_content(stream=True) only returns once the first chunk is in
+                        requested = time.perf_counter()
+                        response = model_instance.generate_content(
+                            prompt,
+                            generation_config={"temperature": temperature},
+                            stream=stream
+                        )
+                        if stream:
+                            timer = streaming.StreamTimer(streaming.gemini_text_chunks(response), started=requested)
+                            response_text = reporter.write_stream(timer)
+                            reporter.caption(timer.summary())
+                        else:
+                            response_text = response.text
+                    except Exception as e:
+                        labels["outcome"] = "quota" if model_health.is_quota_error(e) else "error"
+                        raise
+            health.record_success(model)
+            usage = getattr(response, "usage_metadata", None)
+            if usage and getattr(usage, "total_token_count", None):
+                limiter.adjust(api_key, model, usage.total_token_count - estimated_tokens)
+            reporter.success(f"✅ Response received from **{model}**!") # Indicate success
+            return f"[Response from: {model}]\n\n{response_text}" # Add model name to response
+        except Exception as e:
+            if model_health.is_quota_error(e):
+                cooldown = health.record_quota_error(model, e)
+                reporter.warning(f"⚠ Quota exceeded for {model}, pausing it for {cooldown:.0f}s and trying next model...")
+                continue # Try the next model in the sequence
+            else:
+                health.release(model)
+                reporter.error(f"❌ Error with model {model}: {e}")
+                return f"❌ Error with model {model}: {e}"
+
+    # If all Gemini models failed, switch to DeepSeek
+    reporter.warning("⚠ All configured Gemini models have failed. Switching to DeepSeek...")
+    deepseek_response = get_deepseek_response(prompt, settings["ollama_model"], settings, reporter, stream=stream)
+    return f"[Response from: DeepSeek - {settings['ollama_model']}]\n\n{deepseek_response}"
+
+
+def get_deepseek_response(prompt, selected_model, settings, reporter, stream=False):
+    """
+    Asks Ollama through the shared session: the model is kept resident and
+    num_ctx is sized from the prompt. Time Ollama spent loading the model is
+    recorded as "model_load", apart from "generation".
+    """
+    if not connectivity.get_monitor().is_online("ollama"):
+        reporter.error(f"❌ Ollama is not reachable at {connectivity.ollama_endpoint()}. Cannot get DeepSeek response.")
+        return "❌ Ollama is not reachable."
+    temperature = settings.get("temperature") # Get temperature
+    session = ollama_session.get_session()
+    timings = []
+    try:
+        with concurrency.model_slot(OLLAMA_PROVIDER, selected_model):
+            with metrics.timed("llm_call", provider=OLLAMA_PROVIDER, model=selected_model):
+                requested = time.perf_counter()
+                response = session.chat(selected_model, prompt, temperature, stream=stream)
+                if stream:
+                    # The <think> block is dropped as it streams in, never shown
+                    chunks = streaming.ollama_text_chunks(
+                        response, on_done=lambda part: timings.append(session.record_timings(selected_model, part))
+                    )
+                    timer = streaming.StreamTimer(streaming.strip_think(chunks), started=requested)
+                    response_content = reporter.write_stream(timer).strip()
+                    reporter.caption(timer.summary())
+                else:
+                    response_content = response['message']['content']
+                    timings.append(session.record_timings(selected_model, response))
+        if timings and timings[0][0] >= 1:
+            load_seconds, generation_seconds = timings[0]
+            reporter.caption(f"🧠 Loading {selected_model} took {load_seconds:.1f}s · generation {generation_seconds:.1f}s")
+        if '<think>' in response_content:
+            response_content = response_content.split('</think>')[-1].strip()
+        return f"[Response from: DeepSeek - {selected_model}]\n\n{response_content}" # Add model name
+    except Exception as e:
+        return f"❌ Error generating response: {str(e)}"
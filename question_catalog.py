@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+# Question lists change only through the admin panel, yet user_ui reads them on
+# every rerun. They are kept here, in process memory shared by every session,
+# and reloaded only after invalidate() or, as a safety net for edits made by
+# another server, once they are older than DEFAULT_MAX_AGE seconds.
+DEFAULT_MAX_AGE = float(os.getenv("LAWBOT_QUESTION_CACHE_TTL", "300"))
+
+
+class QuestionCatalog:
+    """Per-table cache of (q_id, ques) rows with a version stamp that every edit bumps."""
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}  # table -> (version, loaded_at, rows)
+        self._counters = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def version(self, table_name):
+        with self._lock:
+            return self._versions.get(table_name, 0)
+
+    def get(self, table_name, load):
+        """
+        Cached rows of table_name. On a miss load() is called and its result
+        cached, unless it returns None (a failed load is retried next time).
+        """
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(table_name, 0)
+            entry = self._entries.get(table_name)
+            if entry and entry[0] == version and now - entry[1] <= self.max_age:
+                self._counters["hits"] += 1
+                return list(entry[2])
+        rows = load()
+        if rows is None:
+            return []
+        with self._lock:
+            self._counters["loads"] += 1
+            # An edit that happened while loading makes these rows stale; keep them uncached
+            if self._versions.get(table_name, 0) == version:
+                self._entries[table_name] = (version, now, list(rows))
+        return list(rows)
+
+    def invalidate(self, table_name):
+        with self._lock:
+            self._versions[table_name] = self._versions.get(table_name, 0) + 1
+            self._entries.pop(table_name, None)
+            self._counters["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._counters,
+                tables={
+                    table: {"version": entry[0], "questions": len(entry[2]), "age": round(time.monotonic() - entry[1], 1)}
+                    for table, entry in self._entries.items()
+                },
+            )
+
+
+catalog = QuestionCatalog()
+
+
+def renumber_questions(conn, table_name):
+    """
+    Renumbers id to 1..n and q_id to Q_1..Q_n in the current id order, as one
+    transaction of set-based statements, and moves the id sequence past n.
+    Returns False without writing when the table is already numbered that way.
+    Rolls back and re-raises on error.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(BOOL_AND(q_id = 'Q_' || id), TRUE) FROM {table_name}"
+        )
+        count, max_id, q_ids_match = cursor.fetchone()
+        if count == max_id and q_ids_match:
+            conn.rollback()
+            return False
+
+        # Park every row on a unique negative id (and a placeholder q_id) first so
+        # the new values never collide with old ones while the UPDATE runs
+        cursor.execute(
+            f"""
+            UPDATE {table_name} AS t SET id = -ordered.position, q_id = '~' || ordered.position
+            FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS position FROM {table_name}) AS ordered
+            WHERE t.id = ordered.id
+            """
+        )
+        cursor.execute(f"UPDATE {table_name} SET id = -id, q_id = 'Q_' || (-id)")
+        cursor.execute(
+            f"""
+            SELECT setval(sequence_name, COALESCE((SELECT MAX(id) FROM {table_name}), 0) + 1, false)
+            FROM (SELECT pg_get_serial_sequence(%s, 'id') AS sequence_name) AS serial
+            WHERE sequence_name IS NOT NULL
+            """,
+            (table_name,),
+        )
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+# Requests and tokens per minute for each Gemini model. Models that are not
+# listed use DEFAULT_LIMITS. Both can be changed at runtime with set_limits().
+DEFAULT_LIMITS = {
+    "rpm": int(os.getenv("LAWBOT_DEFAULT_RPM", "10")),
+    "tpm": int(os.getenv("LAWBOT_DEFAULT_TPM", "250000")),
+}
+MODEL_LIMITS = {
+    "gemini-2.5-pro-exp-03-25": {"rpm": 5, "tpm": 250000},
+    "gemini-2.0-flash": {"rpm": 15, "tpm": 1000000},
+    "gemini-1.5-pro": {"rpm": 2, "tpm": 32000},
+}
+DEFAULT_MAX_WAIT = float(os.getenv("LAWBOT_RATE_LIMIT_MAX_WAIT", "120"))
+RECENT_WAITS = 500
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def key_id(api_key):
+    """Short stable identifier for an API key, so raw keys never end up in stats or the database."""
+    if not api_key:
+        return "default"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class RateLimiter:
+    """
+    Token buckets per (API key, model): one for requests per minute and one
+    for tokens per minute. acquire() reserves capacity in both and sleeps
+    until the reservation is due, so callers queue for quota instead of
+    hitting quota errors. Shared by every session in the process.
+    """
+
+    def __init__(self, limits=None, default_limits=None):
+        self._limits = {model: dict(value) for model, value in (limits or MODEL_LIMITS).items()}
+        self._default_limits = dict(default_limits or DEFAULT_LIMITS)
+        self._lock = threading.Lock()
+        self._buckets = {}  # bucket name -> [tokens, updated_at]
+        self._metrics = {}
+
+    def limits_for(self, model):
+        with self._lock:
+            return dict(self._limits.get(model, self._default_limits))
+
+    def set_limits(self, model, rpm, tpm):
+        with self._lock:
+            self._limits[model] = {"rpm": int(rpm), "tpm": int(tpm)}
+
+    def acquire(self, api_key, model, tokens=0, max_wait=DEFAULT_MAX_WAIT):
+        """Blocks until one request and `tokens` tokens are available; returns the seconds waited."""
+        wait = self._reserve_request(api_key, model, tokens, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, api_key, model, tokens=0, max_wait=DEFAULT_MAX_WAIT):
+        wait = await asyncio.to_thread(self._reserve_request, api_key, model, tokens, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def adjust(self, api_key, model, token_delta):
+        """Corrects the tokens-per-minute bucket once the real token count of a request is known."""
+        if not token_delta:
+            return
+        limits = self.limits_for(model)
+        bucket = f"{key_id(api_key)}:{model}:tpm"
+        self._reserve([(bucket, limits["tpm"], limits["tpm"] / 60.0, token_delta)], None)
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for name, metric in self._metrics.items():
+                recent = sorted(metric["recent_waits"])
+                stats[name] = {
+                    "requests": metric["requests"],
+                    "waited_requests": metric["waited_requests"],
+                    "timeouts": metric["timeouts"],
+                    "total_wait": round(metric["total_wait"], 3),
+                    "max_wait": round(metric["max_wait"], 3),
+                    "p95_wait": round(recent[int(0.95 * (len(recent) - 1))], 3) if recent else 0.0,
+                }
+            return stats
+
+    def _reserve_request(self, api_key, model, tokens, max_wait):
+        limits = self.limits_for(model)
+        prefix = f"{key_id(api_key)}:{model}"
+        reservations = [
+            (f"{prefix}:rpm", limits["rpm"], limits["rpm"] / 60.0, 1),
+            # A request larger than a whole minute of tokens can never fit; cap it at one bucket
+            (f"{prefix}:tpm", limits["tpm"], limits["tpm"] / 60.0, min(tokens, limits["tpm"])),
+        ]
+        try:
+            wait = self._reserve(reservations, max_wait)
+        except RateLimitTimeout:
+            self._record(prefix, None)
+            raise
+        self._record(prefix, wait)
+        return wait
+
+    def _reserve(self, reservations, max_wait):
+        """
+        Atomically takes `amount` from every bucket and returns how long the
+        caller must wait until all of them are back to non-negative. With a
+        max_wait, nothing is taken if the wait would be longer.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for bucket, capacity, rate, amount in reservations:
+                tokens, updated_at = self._buckets.get(bucket, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate) - amount
+                levels.append((bucket, tokens))
+                if tokens < 0 and rate > 0:
+                    wait = max(wait, -tokens / rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitTimeout(f"rate limit capacity not available within {max_wait:.0f}s (needs {wait:.0f}s)")
+            for bucket, tokens in levels:
+                self._buckets[bucket] = (tokens, now)
+            return wait
+
+    def _record(self, name, wait):
+        with self._lock:
+            metric = self._metrics.setdefault(name, {
+                "requests": 0, "waited_requests": 0, "timeouts": 0,
+                "total_wait": 0.0, "max_wait": 0.0, "recent_waits": deque(maxlen=RECENT_WAITS),
+            })
+            if wait is None:
+                metric["timeouts"] += 1
+                return
+            metric["requests"] += 1
+            metric["total_wait"] += wait
+            metric["max_wait"] = max(metric["max_wait"], wait)
+            metric["recent_waits"].append(wait)
+            if wait > 0:
+                metric["waited_requests"] += 1
+
+
+class PostgresRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live in Postgres, so several app servers and
+    batch workers sharing the same API keys draw from the same quota.
+    get_connection() must return a psycopg2-style connection; close() is
+    called on it afterwards (pooled connections go back to the pool).
+    """
+
+    TABLE = "rate_limit_buckets"
+
+    def __init__(self, get_connection, limits=None, default_limits=None):
+        super().__init__(limits, default_limits)
+        self._get_connection = get_connection
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    bucket TEXT PRIMARY KEY,
+                    tokens DOUBLE PRECISION NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    def _reserve(self, reservations, max_wait):
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            # Lock rows in a fixed order so concurrent reservations cannot deadlock
+            reservations = sorted(reservations)
+            cursor.execute("SELECT EXTRACT(EPOCH FROM clock_timestamp())")
+            now = float(cursor.fetchone()[0])
+            levels = []
+            wait = 0.0
+            for bucket, capacity, rate, amount in reservations:
+                cursor.execute(
+                    f"INSERT INTO {self.TABLE} (bucket, tokens, updated_at) VALUES (%s, %s, %s) ON CONFLICT (bucket) DO NOTHING",
+                    (bucket, capacity, now),
+                )
+                cursor.execute(f"SELECT tokens, updated_at FROM {self.TABLE} WHERE bucket = %s FOR UPDATE", (bucket,))
+                tokens, updated_at = cursor.fetchone()
+                tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate) - amount
+                levels.append((bucket, tokens))
+                if tokens < 0 and rate > 0:
+                    wait = max(wait, -tokens / rate)
+            if max_wait is not None and wait > max_wait:
+                conn.rollback()
+                raise RateLimitTimeout(f"rate limit capacity not available within {max_wait:.0f}s (needs {wait:.0f}s)")
+            for bucket, tokens in levels:
+                cursor.execute(f"UPDATE {self.TABLE} SET tokens = %s, updated_at = %s WHERE bucket = %s", (tokens, now, bucket))
+            conn.commit()
+            cursor.close()
+            return wait
+        except RateLimitTimeout:
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process-wide limiter; in-memory unless set_limiter() installed another one."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def set_limiter(limiter):
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
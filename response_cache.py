@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv("LAWBOT_RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+DEFAULT_MAX_BYTES = int(os.getenv("LAWBOT_RESPONSE_CACHE_MAX_MB", "200")) * 1024 * 1024
+DEFAULT_MAX_AGE = float(os.getenv("LAWBOT_RESPONSE_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def make_cache_key(extracted_text, selected_questions, model, temperature):
+    """Content address of one LLM request: document text, ordered questions, model and temperature."""
+    payload = json.dumps(
+        {
+            "text": text_hash(extracted_text),
+            "questions": list(selected_questions or []),
+            "model": model,
+            "temperature": temperature,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def answer_key(document_hash, question, model, temperature):
+    """Content address of one stored answer: document, single question text, model and temperature."""
+    payload = json.dumps(
+        {"text": document_hash, "question": question, "model": model, "temperature": temperature},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk (SQLite) cache of LLM responses that survives restarts.
+
+    Besides whole responses it keeps individual answers per question
+    (get_answers/put_answers), so a rerun with extra questions only asks
+    for the new ones.
+
+    Entries older than max_age seconds are dropped, and once the stored
+    responses (or answers) exceed max_bytes the least recently used ones
+    are evicted.
+    """
+
+    TABLES = ("responses", "answers")
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+            "answer_hits": 0, "answer_misses": 0, "answer_stores": 0,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for table in self.TABLES:
+            self._db.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+        self._db.commit()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.max_age:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self._counters["hits"] += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self._counters["evictions"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8", "surrogatepass")), now, now),
+            )
+            self._counters["stores"] += 1
+            self._evict_locked("responses", now)
+            self._db.commit()
+
+    def get_answers(self, keys):
+        """Stored answers for the given answer_key()s, as {key: answer}; missing keys are left out."""
+        if not self.enabled or not keys:
+            return {}
+        now = time.time()
+        keys = list(keys)
+        with self._lock:
+            placeholders = ", ".join("?" * len(keys))
+            rows = self._db.execute(
+                f"SELECT key, response FROM answers WHERE key IN ({placeholders}) AND created_at >= ?",
+                keys + [now - self.max_age],
+            ).fetchall()
+            if rows:
+                self._db.executemany("UPDATE answers SET accessed_at = ? WHERE key = ?", [(now, key) for key, _ in rows])
+                self._db.commit()
+            self._counters["answer_hits"] += len(rows)
+            self._counters["answer_misses"] += len(keys) - len(rows)
+            return dict(rows)
+
+    def put_answers(self, answers):
+        """Stores {answer_key: answer}."""
+        if not self.enabled or not answers:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO answers (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, answer, len(answer.encode("utf-8", "surrogatepass")), now, now) for key, answer in answers.items()],
+            )
+            self._counters["answer_stores"] += len(answers)
+            self._evict_locked("answers", now)
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            for table in self.TABLES:
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+    def stats(self):
+        with self._lock:
+            entries, total_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            answers, answer_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM answers"
+            ).fetchone()
+            return dict(
+                self._counters, entries=entries, bytes=total_bytes,
+                answers=answers, answer_bytes=answer_bytes, enabled=self.enabled
+            )
+
+    def _evict_locked(self, table, now):
+        expired = self._db.execute(
+            f"DELETE FROM {table} WHERE created_at < ?", (now - self.max_age,)
+        ).rowcount
+        self._counters["evictions"] += expired
+        total_bytes = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            f"SELECT key, size FROM {table} ORDER BY accessed_at"
+        ).fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            total_bytes -= size
+            self._counters["evictions"] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache at DEFAULT_CACHE_PATH, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_MANIFEST_PATH = os.getenv("LAWBOT_MANIFEST_PATH", "run_manifest.sqlite3")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def file_hash(file_path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def request_fingerprint(selected_questions, settings):
+    """Identifies what a file was asked: a changed question list or model setup means redoing it."""
+    payload = json.dumps(
+        {
+            "questions": list(selected_questions or []),
+            "provider": settings.get("model_provider"),
+            "models": settings.get("gemini_model_sequence"),
+            "ollama_model": settings.get("ollama_model"),
+            "temperature": settings.get("temperature"),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    Durable (SQLite) record of every file a folder run has touched: its
+    content hash, what it was asked, its status and where the answer went.
+    A rerun after a crash skips files that are already done and retries
+    only pending, running (interrupted) or failed ones.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                file_path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL,
+                output_path TEXT,
+                error TEXT,
+                seconds REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def completed_output(self, file_path, content_hash, fingerprint):
+        """Output path of a finished run of exactly this file content and request, if its output still exists."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, fingerprint, status, output_path FROM files WHERE file_path = ?",
+                (os.path.abspath(file_path),),
+            ).fetchone()
+        if not row or row[:3] != (content_hash, fingerprint, DONE):
+            return None
+        output_path = row[3]
+        return output_path if output_path and os.path.exists(output_path) else None
+
+    def mark(self, file_path, content_hash, fingerprint, status, output_path=None, error=None, seconds=None):
+        attempt = 1 if status == RUNNING else 0
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO files (file_path, content_hash, fingerprint, status, output_path, error, seconds, attempts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_path) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    fingerprint = excluded.fingerprint,
+                    status = excluded.status,
+                    output_path = excluded.output_path,
+                    error = excluded.error,
+                    seconds = excluded.seconds,
+                    attempts = files.attempts + excluded.attempts,
+                    updated_at = excluded.updated_at
+                """,
+                (os.path.abspath(file_path), content_hash, fingerprint, status, output_path,
+                 None if error is None else str(error), seconds, attempt, time.time()),
+            )
+            self._db.commit()
+
+    def forget_folder(self, folder_path):
+        """Drops the entries of a source folder once it has been fully processed and removed."""
+        prefix = os.path.join(os.path.abspath(folder_path), "")
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE substr(file_path, 1, ?) = ?", (len(prefix), prefix))
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return dict(rows)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM files")
+            self._db.commit()
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """Process-wide manifest at DEFAULT_MANIFEST_PATH, opened on first use."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = RunManifest()
+        return _manifest
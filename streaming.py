@@ -0,0 +1,120 @@
+import time
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ThinkStripper:
+    """
+    Removes <think>...</think> blocks from text that arrives in pieces, even
+    when a tag is split across two pieces. Whitespace right after a closing
+    tag is dropped, like the non-streaming split('</think>')[-1].strip().
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+        self._after_close = False
+
+    def feed(self, text):
+        self._buffer += text
+        visible = []
+        while self._buffer:
+            if self._inside:
+                end = self._buffer.find(THINK_CLOSE)
+                if end == -1:
+                    # Keep only what could be the start of "</think>"
+                    self._buffer = self._buffer[-(len(THINK_CLOSE) - 1):]
+                    break
+                self._buffer = self._buffer[end + len(THINK_CLOSE):]
+                self._inside = False
+                self._after_close = True
+                continue
+            if self._after_close:
+                self._buffer = self._buffer.lstrip()
+                if not self._buffer:
+                    break
+                self._after_close = False
+            start = self._buffer.find(THINK_OPEN)
+            if start != -1:
+                visible.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(THINK_OPEN):]
+                self._inside = True
+                continue
+            keep = _partial_suffix(self._buffer, THINK_OPEN)
+            visible.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return "".join(visible)
+
+    def flush(self):
+        text = "" if self._inside else self._buffer
+        self._buffer = ""
+        return text
+
+
+def _partial_suffix(text, tag):
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+def strip_think(chunks):
+    stripper = ThinkStripper()
+    for chunk in chunks:
+        visible = stripper.feed(chunk)
+        if visible:
+            yield visible
+    tail = stripper.flush()
+    if tail:
+        yield tail
+
+
+def gemini_text_chunks(response):
+    """Text of each chunk of a streamed generate_content response."""
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks with no text part, e.g. a final safety or finish-reason chunk
+            continue
+        if text:
+            yield text
+
+
+def ollama_text_chunks(response, on_done=None):
+    """Text of each chunk of a streamed ollama.chat response; on_done gets the final chunk with Ollama's timings."""
+    for part in response:
+        text = part["message"]["content"]
+        if text:
+            yield text
+        if on_done is not None and part["done"]:
+            on_done(part)
+
+
+class StreamTimer:
+    """
+    Wraps a text iterator and records time to first token and total time,
+    measured from started: pass the time the request was sent when creating
+    the iterator already waited for the first chunk, as Gemini's does.
+    """
+
+    def __init__(self, chunks, started=None):
+        self._chunks = chunks
+        self.started = time.perf_counter() if started is None else started
+        self.first_token = None
+        self.finished = None
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self.first_token is None:
+                self.first_token = time.perf_counter() - self.started
+            yield chunk
+        self.finished = time.perf_counter() - self.started
+
+    def summary(self):
+        first = f"{self.first_token:.2f}s" if self.first_token is not None else "n/a"
+        total = f"{self.finished:.2f}s" if self.finished is not None else "n/a"
+        return f"⏱️ First token after {first} · total {total}"
@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+# Subtrees whose text never reaches the prompt. script/style/nav are dropped
+# on purpose; BeautifulSoup's get_text() already ignored strings inside
+# template/rt/rp, so skipping them keeps the output identical to it.
+SKIPPED_TAGS = frozenset({"script", "style", "nav", "template", "rt", "rp"})
+
+# "auto" is html.parser. The lxml and html5lib backends are faster, but they
+# drop text that html.parser keeps: CDATA sections, and for lxml.html
+# anything after </html>. Choose one explicitly when the inputs allow it.
+HTML_PARSER = os.getenv("LAWBOT_HTML_PARSER", "auto")
+
+
+def available_parsers():
+    """Backends usable on this machine, fastest first."""
+    parsers = []
+    if importlib.util.find_spec("lxml") is not None:
+        parsers += ["lxml.html", "lxml"]
+    parsers.append("html.parser")
+    if importlib.util.find_spec("html5lib") is not None:
+        parsers.append("html5lib")
+    return parsers
+
+
+def resolve_parser(parser=None):
+    parser = parser or HTML_PARSER
+    if parser == "auto":
+        return "html.parser"
+    return parser
+
+
+def extract_text_from_html(html_content, parser=None):
+    """
+    Parses the document once and returns its visible text with whitespace
+    collapsed to single spaces, skipping script, style and nav content.
+
+    parser is "html.parser", "lxml" or "html5lib" (BeautifulSoup tree
+    builders), or "lxml.html" to walk an lxml tree directly without building
+    a BeautifulSoup tree at all.
+    """
+    parser = resolve_parser(parser)
+    if parser == "lxml.html":
+        parts = _lxml_text_parts(html_content)
+    else:
+        parts = _soup_text_parts(BeautifulSoup(html_content, parser))
+    return ' '.join(''.join(parts).split())
+
+
+def _soup_text_parts(soup):
+    # Same string types get_text() returns by default: plain strings and
+    # CDATA, but not comments, doctypes or script/style contents
+    text_types = getattr(soup, "interesting_string_types", (NavigableString, CData))
+    if isinstance(text_types, type):
+        text_types = (text_types,)
+    parts = []
+    stack = list(reversed(soup.contents))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name not in SKIPPED_TAGS:
+                stack.extend(reversed(node.contents))
+        elif type(node) in text_types:
+            parts.append(node)
+    return parts
+
+
+def _lxml_text_parts(html_content):
+    import lxml.etree
+    import lxml.html
+
+    if isinstance(html_content, str):
+        # lxml refuses str input that carries an XML encoding declaration
+        html_content = html_content.encode("utf-8")
+        html_parser = lxml.html.HTMLParser(encoding="utf-8")
+    else:
+        html_parser = lxml.html.HTMLParser()
+    try:
+        root = lxml.html.document_fromstring(html_content, parser=html_parser)
+    except lxml.etree.ParserError:
+        # Raised for documents with no content at all
+        return []
+
+    parts = []
+    # (element, None) visits an element; (None, text) emits a tail string
+    stack = [(root, None)]
+    while stack:
+        element, tail = stack.pop()
+        if element is None:
+            parts.append(tail)
+            continue
+        # Comments and processing instructions have a non-str tag
+        if not isinstance(element.tag, str) or element.tag.lower() in SKIPPED_TAGS:
+            continue
+        if element.text:
+            parts.append(element.text)
+        for child in reversed(element):
+            if child.tail:
+                stack.append((None, child.tail))
+            stack.append((child, None))
+    return parts